@@ -0,0 +1,87 @@
+# admission.py
+# In-flight limit with a bounded wait queue for async endpoints (load shedding).
+#
+# Up to `limit` requests hold a slot at once. Up to `max_queue` more wait in
+# FIFO order for at most `queue_timeout` seconds; anything beyond that is
+# rejected immediately with `Overloaded`, which the endpoint turns into a 503
+# with Retry-After. All state lives on the event loop thread, so no locks.
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot get a slot (queue full or waited too long)."""
+
+
+class AdmissionControl:
+    def __init__(self, limit: int, max_queue: int = 0, queue_timeout: float = 1.0):
+        self.limit = max(1, int(limit))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout)
+        self._active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self):
+        """Take a slot (or raise Overloaded); pair with exactly one `release()`, e.g. from a done callback."""
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded("Too many requests in flight")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                # the slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded("Timed out waiting for a slot") from None
+            raise
+        self.admitted += 1
+
+    def release(self):
+        # hand the slot straight to the oldest waiter; the active count is unchanged
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self._active,
+            "waiting": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
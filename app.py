@@ -11,6 +11,8 @@ st.set_page_config(page_title="🌍 Influmony!", layout="wide")
 
 # Backend URL (FastAPI/Railway)
 BACKEND = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+# How long the send button waits for a queued email job before giving up on it
+EMAIL_SEND_TIMEOUT = float(os.getenv("EMAIL_SEND_TIMEOUT", "600"))
 
 # ----------------- Global Styles (Treact-ish glass UI) -----------------
 BG_URL = "https://media.licdn.com/dms/image/v2/C4D12AQFVxGkx714_oA/article-cover_image-shrink_720_1280/article-cover_image-shrink_720_1280/0/1534840658881?e=2147483647&v=beta&t=3vthWXnw1iqVQqOLCeq2HemiBCiYSa9UYQHtOwtec8E"
@@ -107,7 +109,7 @@ hr {{ border: none; height: 1px; background: rgba(15,23,42,0.08); margin: 6px 0
 """, unsafe_allow_html=True)
 
 # ----------------- Reusable results renderer (UI only) -----------------
-def render_matches_table(matches: list, *, key: str = "results"):
+def render_matches_table(matches: list, *, key: str = "results", show_download: bool = True):
     # Guard
     if not matches:
         st.warning("No results to display")
@@ -174,6 +176,9 @@ def render_matches_table(matches: list, *, key: str = "results"):
         },
     )
 
+    if not show_download:
+        return
+
     # Safe CSV export with unique key
     try:
         csv_bytes = df.to_csv(index=False).encode("utf-8")
@@ -188,6 +193,36 @@ def render_matches_table(matches: list, *, key: str = "results"):
     except Exception as e:
         st.caption(f"CSV export unavailable: {e}")
 
+# ----------------- Streaming /match client -----------------
+def stream_matches(payload: dict, placeholder) -> dict:
+    """Call /match/stream and re-render the table in `placeholder` as outreach messages arrive."""
+    data = {"matches": [], "explanations": ""}
+    with requests.post(f"{BACKEND}/match/stream", json=payload, stream=True, timeout=60) as r:
+        if r.status_code >= 400:
+            try:
+                detail = r.json().get("detail", r.text)
+            except Exception:
+                detail = r.text
+            raise RuntimeError(detail)
+        for line in r.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["event"] == "matches":
+                data["matches"] = event["matches"]
+                data["explanations"] = event.get("explanations", "")
+                for m in data["matches"]:
+                    m.setdefault("outreach_message", "⏳ generating…")
+            elif event["event"] == "outreach":
+                data["matches"][event["index"]]["outreach_message"] = event["outreach_message"]
+            elif event["event"] == "done":
+                break
+            if data["matches"]:
+                with placeholder.container():
+                    render_matches_table(data["matches"], key="stream", show_download=False)
+    placeholder.empty()
+    return data
+
 # ----------------- Simple local auth (bcrypt + JSON) -----------------
 USERS_PATH = Path("data/local_users.json")
 USERS_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -404,25 +439,19 @@ if st.button("🔍 Find Influencers", type="primary", use_container_width=True):
         }
         with st.spinner("Finding best influencers…"):
             try:
-                r = requests.post(f"{BACKEND}/match", json=payload, timeout=60)
-                if r.status_code >= 400:
-                    try:
-                        st.error(r.json().get("detail", r.text))
-                    except Exception:
-                        st.error(r.text)
+                live = st.empty()
+                data = stream_matches(payload, live)
+                matches = data.get("matches", [])
+                if not matches:
+                    st.warning(data.get("explanations", "No results"))
+                    st.session_state["search_results"] = None
                 else:
-                    data = r.json()
-                    matches = data.get("matches", [])
-                    if not matches:
-                        st.warning(data.get("explanations", "No results"))
-                        st.session_state["search_results"] = None
-                    else:
-                        st.success(data.get("explanations"))
-                        st.session_state["search_results"] = matches
-                        st.session_state["campaign_brief"] = brief
-                        st.markdown('<div class="card">', unsafe_allow_html=True)
-                        render_matches_table(matches, key="search")
-                        st.markdown('</div>', unsafe_allow_html=True)
+                    st.success(data.get("explanations"))
+                    st.session_state["search_results"] = matches
+                    st.session_state["campaign_brief"] = brief
+                    st.markdown('<div class="card">', unsafe_allow_html=True)
+                    render_matches_table(matches, key="search")
+                    st.markdown('</div>', unsafe_allow_html=True)
             except Exception as e:
                 st.error(str(e))
 
@@ -474,25 +503,51 @@ if st.session_state.get("search_results"):
 
             with st.spinner("Sending emails..."):
                 try:
-                    r = requests.post(f"{BACKEND}/send-emails", json=email_payload, timeout=120)
+                    r = requests.post(f"{BACKEND}/send-emails", json=email_payload, timeout=15)
                     if r.status_code >= 400:
                         error_detail = r.json().get("detail", r.text) if r.headers.get("content-type") == "application/json" else r.text
                         st.error(f"❌ Failed to send emails: {error_detail}")
                     else:
+                        # The backend queues a job; poll it until every recipient is settled
                         result = r.json()
-
-                        if result["success"] > 0:
-                            st.success(f"✅ Successfully sent {result['success']} email(s)!")
-
-                        if result["failed"] > 0:
-                            st.warning(f"⚠️ Failed to send {result['failed']} email(s)")
-
-                        with st.expander("📋 View Email Sending Details"):
-                            for res in result["results"]:
-                                if res["status"] == "sent":
-                                    st.write(f"✅ {res['name']} ({res['email']})")
-                                else:
-                                    st.write(f"❌ {res['email']}: {res.get('error', 'Unknown error')}")
+                        job_id = result["job_id"]
+                        progress = st.progress(0.0, text="Queued…")
+                        deadline = time.monotonic() + EMAIL_SEND_TIMEOUT
+                        while result.get("status") not in ("completed", "failed"):
+                            if time.monotonic() > deadline:
+                                break
+                            time.sleep(1)
+                            poll = requests.get(f"{BACKEND}/send-emails/{job_id}", timeout=10)
+                            result = poll.json()
+                            if poll.status_code >= 400:
+                                break
+                            done = result["success"] + result["failed"]
+                            rate = result.get("throughput_per_s")
+                            progress.progress(
+                                done / max(1, result["total"]),
+                                text=f"Sent {result['success']}/{result['total']}"
+                                     + (f" · {rate:.1f}/s" if rate else ""),
+                            )
+                        progress.empty()
+
+                        if result.get("status") not in ("completed", "failed"):
+                            # timed out, or the backend lost the job (404)
+                            detail = result.get("detail") or f"not finished after {EMAIL_SEND_TIMEOUT:.0f}s"
+                            st.error(f"❌ Email job {job_id}: {detail}. It may still be sending; "
+                                     f"see GET /send-emails/{job_id}.")
+                        else:
+                            if result["success"] > 0:
+                                st.success(f"✅ Successfully sent {result['success']} email(s)!")
+
+                            if result["failed"] > 0:
+                                st.warning(f"⚠️ Failed to send {result['failed']} email(s)")
+
+                            with st.expander("📋 View Email Sending Details"):
+                                for res in result["results"]:
+                                    if res["status"] == "sent":
+                                        st.write(f"✅ {res['name']} ({res['email']})")
+                                    else:
+                                        st.write(f"❌ {res['email']}: {res.get('error', 'Unknown error')}")
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
 
@@ -0,0 +1,277 @@
+# artifact.py
+# Columnar binary dataset artifact, compiled from the CSV by `python ingest.py`.
+#
+#   <artifact>/manifest.json    format version, source CSV stamp, model, shapes
+#   <artifact>/table.arrow      Arrow IPC file: typed columns, dictionary-encoded
+#                               platform/category/country/continent, text_id
+#   <artifact>/texts.arrow      distinct embedding texts (aligned with embeddings.npy)
+#   <artifact>/embeddings.npy   float32 (U, D), L2-normalized
+#   <artifact>/row_hashes.npy   uint64 (N,), content hash per row (reload diffs)
+#   <artifact>/filter-<col>-{codes,order,offsets}.npy   FilterIndex posting lists
+#
+# Everything is memory-mapped on load, so startup cost no longer scales with
+# CSV parsing, string cleaning or encoding.
+#
+# Shared mode: `publish()` writes artifacts as numbered generations under one
+# directory and flips a CURRENT pointer. Every worker process maps the same
+# files read-only, so the OS page cache holds a single copy for all of them, and
+# workers pick up a new generation without restarting.
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except Exception:  # optional: the backend falls back to parsing the CSV
+    pa = None
+    pa_ipc = None
+
+ARTIFACT_VERSION = 1
+CATEGORICAL_COLUMNS = ["platform", "category", "country", "continent"]
+
+
+def default_path(csv_path: str) -> str:
+    root, _ = os.path.splitext(csv_path)
+    return root + ".artifact"
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == ARTIFACT_VERSION else None
+
+
+def write(path: str, df: pd.DataFrame, texts: pd.Index, embeddings: np.ndarray, emb_index: np.ndarray,
+          row_hashes: np.ndarray, model: str, source: Dict[str, Any],
+          filters: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Write an in-memory dataset as an artifact (see `Writer` to stream one chunk at a time)."""
+    w = Writer(path)
+    try:
+        w.append_rows(df, emb_index)
+        w.append_array("row_hashes", np.asarray(row_hashes, dtype=np.uint64))
+        w.array("embeddings", embeddings.shape)[:] = embeddings
+        return w.close(texts, model, source, filters)
+    except BaseException:
+        w.abort()
+        raise
+
+
+class Writer:
+    """Builds an artifact in a temp dir, one chunk of rows at a time; `close()` renames it into place.
+
+    Rows become Arrow record batches as they arrive. The categorical columns keep
+    one dictionary that grows across batches (written as dictionary deltas), so no
+    column is ever held whole in memory.
+    """
+
+    def __init__(self, path: str):
+        if pa is None:
+            raise RuntimeError("pyarrow is required to build dataset artifacts (pip install pyarrow)")
+        self.path = path
+        self.tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.rows = 0
+        self._table = None
+        self._dicts: Dict[str, Dict[str, int]] = {}
+        self._streams: Dict[str, tuple] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def append_rows(self, df: pd.DataFrame, text_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Write one chunk; returns its codes into `dictionary(col)` for the categorical columns."""
+        cols, codes = {}, {}
+        for col in df.columns:
+            values = df[col]
+            if col in CATEGORICAL_COLUMNS:
+                codes[col] = self._encode(col, values)
+                cols[col] = pa.DictionaryArray.from_arrays(
+                    pa.array(codes[col], mask=codes[col] < 0), pa.array(self.dictionary(col), type=pa.string()))
+            elif col == "followers":
+                cols[col] = pa.array(values.to_numpy(dtype=np.int64))
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                # decoded through the categories, not one Python string per row
+                cats = pa.array(values.cat.categories.to_numpy(dtype=object), type=pa.string())
+                cols[col] = cats.take(pa.array(values.cat.codes.to_numpy()))
+            else:
+                cols[col] = pa.array(values.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+        cols["text_id"] = pa.array(np.asarray(text_ids, dtype=np.int32))
+        batch = pa.record_batch(list(cols.values()), names=list(cols))
+        if self._table is None:
+            self._table = pa_ipc.new_file(os.path.join(self.tmp, "table.arrow"), batch.schema,
+                                          options=pa_ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        self._table.write_batch(batch)
+        self.rows += len(df)
+        return codes
+
+    def _encode(self, col: str, values: pd.Series) -> np.ndarray:
+        # chunk-local values -> ids in this column's growing dictionary (-1 for missing)
+        lookup = self._dicts.setdefault(col, {})
+        cat = values.astype("category").cat
+        ids = np.array([lookup.setdefault(str(v), len(lookup)) for v in cat.categories] + [-1], dtype=np.int32)
+        return ids[cat.codes.to_numpy()]
+
+    def dictionary(self, col: str) -> List[str]:
+        return list(self._dicts.get(col, {}))
+
+    def append_array(self, name: str, block: np.ndarray):
+        """Stream a 1-D array to <name>.npy a block at a time (its length is only known at close)."""
+        if name not in self._streams:
+            self._streams[name] = (open(os.path.join(self.tmp, name + ".bin"), "wb"), block.dtype)
+        f, _ = self._streams[name]
+        f.write(np.ascontiguousarray(block).tobytes())
+
+    def array(self, name: str, shape, dtype=np.float32) -> np.ndarray:
+        """A writable memory-mapped <name>.npy for the caller to fill (e.g. embeddings, block by block)."""
+        out = np.lib.format.open_memmap(os.path.join(self.tmp, name + ".npy"), mode="w+", dtype=dtype,
+                                        shape=tuple(shape))
+        self._arrays[name] = out
+        return out
+
+    def close(self, texts, model: str, source: Dict[str, Any],
+              filters: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        if self._table is not None:
+            self._table.close()
+        for name, (f, dtype) in self._streams.items():
+            f.close()
+            raw = os.path.join(self.tmp, name + ".bin")
+            n = os.path.getsize(raw) // np.dtype(dtype).itemsize
+            out = np.lib.format.open_memmap(os.path.join(self.tmp, name + ".npy"), mode="w+", dtype=dtype, shape=(n,))
+            if n:
+                src = np.memmap(raw, dtype=dtype, mode="r")
+                for start in range(0, n, 1 << 22):
+                    out[start:start + (1 << 22)] = src[start:start + (1 << 22)]
+                del src
+            out.flush()
+            del out
+            os.remove(raw)
+        for out in self._arrays.values():
+            out.flush()
+        embeddings = self._arrays.get("embeddings")
+        texts = list(texts)
+        schema = pa.schema([("text", pa.string())])
+        with pa_ipc.new_file(os.path.join(self.tmp, "texts.arrow"), schema) as f:
+            for start in range(0, max(1, len(texts)), 1 << 16):
+                f.write_batch(pa.record_batch([pa.array(texts[start:start + (1 << 16)], type=pa.string())], schema=schema))
+        for col, arrays in (filters or {}).items():
+            for name in ("codes", "order", "offsets"):
+                np.save(os.path.join(self.tmp, f"filter-{col}-{name}.npy"), np.asarray(arrays[name]))
+
+        manifest = {
+            "version": ARTIFACT_VERSION,
+            "model": model,
+            "source": source,
+            "rows": int(self.rows),
+            "distinct_texts": int(len(texts)),
+            "dim": int(embeddings.shape[1]) if embeddings is not None else 0,
+            "filters": {col: list(arrays["values"]) for col, arrays in (filters or {}).items()},
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self.tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        self._arrays.clear()
+
+        old = f"{self.path}.old-{os.getpid()}"
+        if os.path.exists(self.path):
+            os.replace(self.path, old)
+        os.replace(self.tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        return manifest
+
+    def abort(self):
+        if self._table is not None:
+            try:
+                self._table.close()
+            except Exception:
+                pass
+        for f, _ in self._streams.values():
+            f.close()
+        self._arrays.clear()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def _read_ipc(path: str):
+    return pa_ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def read(path: str) -> Dict[str, Any]:
+    """Memory-map an artifact.
+
+    Returns df, texts, embeddings, emb_index, row_hashes, filters (FilterIndex
+    arrays, or None for artifacts built without them) and manifest.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required to load dataset artifacts (pip install pyarrow)")
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise ValueError(f"No valid dataset artifact at {path}")
+
+    table = _read_ipc(os.path.join(path, "table.arrow"))
+    emb_index = table.column("text_id").to_numpy().astype(np.int32, copy=False)
+    df = table.drop_columns(["text_id"]).to_pandas()
+    texts = pd.Index(_read_ipc(os.path.join(path, "texts.arrow")).column("text").to_pylist(), dtype=object)
+
+    filters = None
+    if manifest.get("filters"):
+        filters = {
+            col: {"values": values, **{
+                name: np.load(os.path.join(path, f"filter-{col}-{name}.npy"), mmap_mode="r")
+                for name in ("codes", "order", "offsets")
+            }}
+            for col, values in manifest["filters"].items()
+        }
+    return {
+        "df": df,
+        "texts": texts,
+        "embeddings": np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r"),
+        "emb_index": emb_index,
+        "row_hashes": np.load(os.path.join(path, "row_hashes.npy"), mmap_mode="r"),
+        "filters": filters,
+        "manifest": manifest,
+    }
+
+
+# ---- Generations (shared mode) ----
+def current_generation(root: str) -> Optional[str]:
+    """Path of the generation CURRENT points at, or None if nothing was published."""
+    try:
+        with open(os.path.join(root, "CURRENT"), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(root, name)
+    return path if name and read_manifest(path) is not None else None
+
+
+def generation_number(path: str) -> int:
+    """N of a gen-NNNNNN generation: the same in every worker that attaches it."""
+    return int(os.path.basename(os.path.normpath(path))[4:])
+
+
+def publish(root: str, write_fn, keep: int = 3) -> str:
+    """Write a new generation with `write_fn(path)`, point CURRENT at it, prune old ones.
+
+    Pruned generations may still be mapped by workers that have not switched
+    yet; that is safe on POSIX, where the pages live until the last unmap.
+    """
+    os.makedirs(root, exist_ok=True)
+    gens = sorted(int(d[4:]) for d in os.listdir(root) if d.startswith("gen-") and d[4:].isdigit())
+    name = f"gen-{(gens[-1] + 1) if gens else 1:06d}"
+    write_fn(os.path.join(root, name))
+
+    tmp = os.path.join(root, f"CURRENT.tmp-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(root, "CURRENT"))
+
+    for old in gens[:max(0, len(gens) + 1 - keep)]:
+        shutil.rmtree(os.path.join(root, f"gen-{old:06d}"), ignore_errors=True)
+    return os.path.join(root, name)
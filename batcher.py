@@ -0,0 +1,86 @@
+# batcher.py
+# Coalesces concurrent single-item calls into batched calls (used for query encodes).
+#
+# Callers block in `submit()`. One worker thread takes the first waiting item,
+# keeps collecting for up to `window` seconds or until `max_batch` items are
+# queued, runs `fn` once on the whole batch and hands every caller its result.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """`fn(items) -> results` (same length and order) shared by concurrent callers."""
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], window: float = 0.002, max_batch: int = 32,
+                 name: str = "batcher"):
+        self.fn = fn
+        self.window = max(0.0, float(window))
+        self.max_batch = max(1, int(max_batch))
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.wait_s = 0.0      # summed per item: enqueue -> batch start
+        self.run_s = 0.0       # summed per batch: time inside fn
+
+    def submit(self, item: Any) -> Any:
+        if self._thread is None:
+            self._start()
+        fut: Future = Future()
+        self._queue.put((item, fut, time.perf_counter()))
+        return fut.result()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: List[tuple]):
+        start = time.perf_counter()
+        try:
+            results = self.fn([item for item, _, _ in batch])
+        except Exception as e:
+            for _, fut, _ in batch:
+                fut.set_exception(e)
+            results = None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+            self.wait_s += sum(start - t for _, _, t in batch)
+            self.run_s += elapsed
+        if results is not None:
+            for (_, fut, _), result in zip(batch, results):
+                fut.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window * 1000, 3),
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest,
+            "mean_queue_wait_ms": round(self.wait_s / self.items * 1000, 3) if self.items else None,
+            "mean_encode_ms": round(self.run_s / self.batches * 1000, 3) if self.batches else None,
+        }
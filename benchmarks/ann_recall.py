@@ -0,0 +1,99 @@
+# benchmarks/ann_recall.py
+# Recall-vs-latency of the IVF retriever against the exact path on a synthetic catalog.
+#
+#   python benchmarks/ann_recall.py --texts 200000 --rows 1000000 --k 10
+#
+# Vectors are drawn from a Gaussian mixture (so cells are meaningful), rows are
+# mapped to texts at random and a random shard filter keeps ~1/`--filter` of the rows.
+# Recall is tie-aware: an ANN hit counts if its similarity reaches the exact k-th best.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from retrieval import ExactRetriever, FilterIndex, IVFRetriever  # noqa: E402
+
+
+def make_catalog(n_texts, n_rows, dim, topics, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, topics, n_texts)] + 0.6 * rng.standard_normal((n_texts, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    text_ids = rng.integers(0, n_texts, n_rows).astype(np.int32)
+    return vecs, text_ids
+
+
+def top_sims(retriever, q, mask, k, **kw):
+    rows, sim = retriever.candidates(q, mask, k, **kw)
+    if sim.size <= k:
+        return np.sort(sim)[::-1]
+    return np.sort(sim[np.argpartition(-sim, k - 1)[:k]])[::-1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="IVF recall vs latency against exact retrieval")
+    ap.add_argument("--texts", type=int, default=100_000, help="distinct embedding texts")
+    ap.add_argument("--rows", type=int, default=500_000, help="dataset rows")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--topics", type=int, default=200)
+    ap.add_argument("--nlist", type=int, default=0)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--filter", type=int, default=5, help="keep ~1/N rows per query (1 = no filter)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = ap.parse_args()
+
+    vecs, text_ids = make_catalog(args.texts, args.rows, args.dim, args.topics, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vecs[rng.integers(0, args.texts, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    shard = pd.DataFrame({"shard": rng.integers(0, max(1, args.filter), args.rows).astype(str)})
+    filters = FilterIndex(shard, columns=["shard"])
+    masks = [None if args.filter <= 1 else filters.select(shard=str(rng.integers(0, args.filter)))
+             for _ in range(args.queries)]
+
+    exact = ExactRetriever(vecs, text_ids)
+    t0 = time.perf_counter()
+    ivf = IVFRetriever(vecs, text_ids, nlist=args.nlist)
+    build_s = time.perf_counter() - t0
+
+    def run(fn):
+        lat, outs = [], []
+        for q, m in zip(queries, masks):
+            t = time.perf_counter()
+            outs.append(fn(q, m))
+            lat.append((time.perf_counter() - t) * 1000)
+        return np.array(lat), outs
+
+    exact_lat, truth = run(lambda q, m: top_sims(exact, q, m, args.k))
+    results = [{"engine": "exact", "recall": 1.0,
+                "p50_ms": float(np.percentile(exact_lat, 50)), "p99_ms": float(np.percentile(exact_lat, 99))}]
+    for nprobe in args.nprobe:
+        lat, got = run(lambda q, m: top_sims(ivf, q, m, args.k, nprobe=nprobe))
+        recall = np.mean([
+            np.count_nonzero(g >= t[-1] - 1e-6) / max(1, t.size) if t.size else 1.0
+            for g, t in zip(got, truth)
+        ])
+        results.append({"engine": "ivf", "nprobe": nprobe, "recall": float(min(1.0, recall)),
+                        "p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99))})
+
+    summary = {"texts": args.texts, "rows": args.rows, "dim": args.dim, "k": args.k,
+               "nlist": ivf.nlist, "build_s": round(build_s, 3), "results": results}
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"rows={args.rows:,} texts={args.texts:,} nlist={ivf.nlist} build={build_s:.2f}s k={args.k}")
+    print(f"{'engine':<8}{'nprobe':>8}{'recall':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['engine']:<8}{r.get('nprobe', '-'):>8}{r['recall']:>9.3f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/compact_mode.py
+# Memory and ranking agreement of COMPACT_MODE / EMB_QUANT against the float32 baseline.
+#
+#   python benchmarks/compact_mode.py --csv data/influencers_top1000.csv --texts 200000
+#
+# Frame memory is measured on the real CSV (plain vs `_compact_frame`); embedding
+# memory, latency and top-k agreement on a synthetic clustered matrix.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import main  # noqa: E402
+from ann_recall import make_catalog  # noqa: E402
+from retrieval import quantize  # noqa: E402
+
+
+def frame_memory(csv_path):
+    df = main._read_csv(csv_path)
+    plain = int(df.memory_usage(deep=True).sum())
+    compact = int(main._compact_frame(df).memory_usage(deep=True).sum())
+    return {"rows": int(df.shape[0]), "plain_bytes": plain, "compact_bytes": compact,
+            "ratio": round(compact / plain, 3) if plain else None}
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Compact mode memory and ranking agreement")
+    ap.add_argument("--csv", default=main.DATA_PATH)
+    ap.add_argument("--texts", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--topics", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = ap.parse_args()
+
+    vecs, _ = make_catalog(args.texts, 1, args.dim, args.topics, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vecs[rng.integers(0, args.texts, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    base_sims = [np.dot(vecs, q) for q in queries]
+    base_top = [set(np.argpartition(-s, args.k - 1)[:args.k].tolist()) for s in base_sims]
+
+    embeddings = []
+    for kind in ["float32", "float16", "int8"]:
+        mat = quantize(vecs, kind)
+        lat, recall, err = [], [], []
+        for q, s0, top0 in zip(queries, base_sims, base_top):
+            t = time.perf_counter()
+            s = mat.dot(q) if hasattr(mat, "dot") else np.dot(mat, q)
+            lat.append((time.perf_counter() - t) * 1000)
+            recall.append(len(top0 & set(np.argpartition(-s, args.k - 1)[:args.k].tolist())) / args.k)
+            err.append(float(np.abs(s - s0).max()))
+        embeddings.append({
+            "kind": kind,
+            "bytes": int(mat.nbytes),
+            "ratio": round(mat.nbytes / vecs.nbytes, 3),
+            "recall_at_k": round(float(np.mean(recall)), 4),
+            "max_abs_sim_error": round(max(err), 6),
+            "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        })
+
+    summary = {"frame": frame_memory(args.csv), "texts": args.texts, "dim": args.dim, "k": args.k,
+               "embeddings": embeddings}
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    f = summary["frame"]
+    print(f"frame ({f['rows']:,} rows): {f['plain_bytes']:,} B -> {f['compact_bytes']:,} B ({f['ratio']}x)")
+    print(f"{'embeddings':<10}{'bytes':>14}{'ratio':>8}{'recall@k':>10}{'max err':>10}{'p50 ms':>9}")
+    for e in embeddings:
+        print(f"{e['kind']:<10}{e['bytes']:>14,}{e['ratio']:>8}{e['recall_at_k']:>10}"
+              f"{e['max_abs_sim_error']:>10}{e['p50_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,364 @@
+# benchmarks/scale.py
+# End-to-end scaling benchmark on synthetic catalogs from generate_dataset.py.
+#
+#   python benchmarks/scale.py --sizes 1000,100000,1000000 --hashtags 500
+#   python benchmarks/scale.py --sizes 1000 --compare benchmarks/.scale/results-<commit>.json
+#
+# For each catalog size, in fresh processes: `_load_dataset` time and peak RSS
+# with an empty embedding cache (cold) and with a filled one (warm); then, in the
+# warm process, /meta cost and /match p50/p99 and throughput at each
+# --concurrency level, driven through the ASGI app in-process (no network).
+# Email send throughput is measured once per --smtp-pool size against a local
+# aiosmtpd server (pip install aiosmtpd). Catalogs are cached in --workdir and
+# generating them is not part of any timing.
+#
+# Results go to --out as JSON, stamped with the git commit, so runs on two
+# commits can be diffed with --compare.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import generate_dataset  # noqa: E402
+
+# Effective settings recorded with the results (read from main in the serving process)
+CONFIG_KEYS = ["EMB_MODEL", "RETRIEVAL_MODE", "EMB_QUANT", "COMPACT_MODE", "IVF_NLIST", "IVF_NPROBE",
+               "QUERY_BATCH_WINDOW_MS", "QUERY_BATCH_MAX", "MATCH_MAX_INFLIGHT", "MATCH_MAX_QUEUE", "CPU_WORKERS",
+               "MATCH_CACHE_SIZE", "QUERY_CACHE_SIZE"]
+
+BRIEF_PRODUCTS = ["running shoe", "budget phone", "vegan snack", "travel backpack", "skincare serum", "indie game",
+                  "coding course", "fintech app", "smart watch", "coffee brand"]
+BRIEF_AUDIENCES = ["gen z", "young parents", "students", "busy professionals", "gamers", "outdoor lovers"]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _latency_summary(lat_s):
+    ms = np.asarray(lat_s) * 1000
+    if not ms.size:
+        return {"p50_ms": None, "p99_ms": None, "mean_ms": None}
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "mean_ms": round(float(ms.mean()), 3)}
+
+
+# ---- Child processes (one per measurement, so peak RSS is per run) ----
+def child_load(args):
+    import main
+
+    t0 = time.perf_counter()
+    main._get_model()
+    out = {"model_load_s": round(time.perf_counter() - t0, 3), "rss_before_load_mb": _peak_rss_mb()}
+    timings = {}
+    t0 = time.perf_counter()
+    data = main._load_dataset(main.DATA_PATH, None, timings)
+    out.update(load_s=round(time.perf_counter() - t0, 3), peak_rss_mb=_peak_rss_mb(), timings=timings,
+               rows=int(data.df.shape[0]), distinct_texts=int(len(data.texts)))
+    if args.child == "serve":
+        main._data = data
+        main._startup["state"] = "ready"
+        main._ready.set()
+        out.update(asyncio.run(_serve(main, args)))
+        out["config"] = {k: getattr(main, k) for k in CONFIG_KEYS}
+    return out
+
+
+async def _serve(main, args):
+    import httpx
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        lat = []
+        for _ in range(args.meta_calls):
+            t0 = time.perf_counter()
+            r = await client.get("/meta")
+            lat.append(time.perf_counter() - t0)
+            r.raise_for_status()
+        meta = r.json()
+        out = {"meta": {"calls": args.meta_calls, **_latency_summary(lat)}}
+
+        rng = random.Random(args.seed)
+        counter = iter(range(10 ** 9))
+
+        def body():
+            # distinct briefs, so every request pays for its query encode
+            body = {"brief": f"{rng.choice(BRIEF_PRODUCTS)} launch for {rng.choice(BRIEF_AUDIENCES)} "
+                             f"via {rng.choice(meta['categories'])} creators, campaign {next(counter)}",
+                    "top_k": 10, "outreach": args.outreach}
+            if rng.random() < 0.5:
+                body["continent"] = rng.choice(meta["continents"])
+            return body
+
+        await _drive(client, "/match", body, concurrency=4, requests=args.warmup)
+        out["match"] = [{"concurrency": c, **await _drive(client, "/match", body, c, args.requests)}
+                        for c in args.concurrency]
+    return out
+
+
+async def _drive(client, path, make_body, concurrency, requests):
+    """POST `requests` bodies from `concurrency` concurrent clients; latency per request."""
+    todo = [make_body() for _ in range(requests)]
+    lat, status = [], {}
+
+    async def worker():
+        while todo:
+            body = todo.pop()
+            t0 = time.perf_counter()
+            r = await client.post(path, json=body)
+            if r.status_code == 200:
+                lat.append(time.perf_counter() - t0)
+            status[str(r.status_code)] = status.get(str(r.status_code), 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - t0
+    return {"requests": requests, "ok": len(lat), "status": status, **_latency_summary(lat),
+            "throughput_rps": round(len(lat) / elapsed, 2) if elapsed > 0 else None}
+
+
+def child_email(args):
+    import httpx
+    import main
+
+    main._email_jobs.start()
+    recipients = [{"name": f"Creator {i}", "email": f"creator{i}@example.com",
+                   "message": f"Hi Creator {i}, we would love to work with you on our next campaign."}
+                  for i in range(args.emails)]
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            t0 = time.perf_counter()
+            r = await client.post("/send-emails", json={"recipients": recipients, "subject": "Benchmark"})
+            r.raise_for_status()
+            job_id = r.json()["job_id"]
+            while True:
+                status = (await client.get(f"/send-emails/{job_id}")).json()
+                if status["status"] == "completed":
+                    return status, time.perf_counter() - t0
+                await asyncio.sleep(0.02)
+
+    status, elapsed = asyncio.run(run())
+    pool = main._smtp_pool
+    return {"pool_size": main.SMTP_POOL_SIZE, "messages": args.emails, "sent": status["success"],
+            "failed": status["failed"], "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(status["success"] / elapsed, 2) if elapsed > 0 else None,
+            "smtp_connects": pool.connects if pool is not None else 0}
+
+
+# ---- Orchestration ----
+def _catalog(args, rows):
+    name = f"catalog-{rows}-c{args.categories}-n{args.countries}-h{args.hashtags}-s{args.seed}.csv"
+    path = Path(args.workdir) / name
+    info = {"rows": rows, "csv": str(path)}
+    if not path.exists():
+        t0 = time.perf_counter()
+        tmp = path.with_suffix(".tmp")
+        generate_dataset.write(tmp, rows, seed=args.seed, n_categories=args.categories, n_countries=args.countries,
+                               n_hashtags=args.hashtags, processes=os.cpu_count() or 1, fmt="csv")
+        os.replace(tmp, path)
+        info["generate_s"] = round(time.perf_counter() - t0, 3)
+    info["csv_bytes"] = path.stat().st_size
+    return info
+
+
+def _run_child(mode, env, csv=""):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        out_path = f.name
+    try:
+        cmd = [sys.executable, __file__, *sys.argv[1:], "--child", mode, "--csv", csv, "--child-out", out_path]
+        proc = subprocess.run(cmd, env={**os.environ, **env}, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise SystemExit(f"❌ {mode} run failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-4000:]}")
+        with open(out_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.unlink(out_path)
+
+
+def bench_catalog(args, rows):
+    info = _catalog(args, rows)
+    cache = Path(args.workdir) / (Path(info["csv"]).stem + ".emb_cache")
+    shutil.rmtree(cache, ignore_errors=True)
+    env = {"DATA_PATH": info["csv"], "EMB_CACHE_DIR": str(cache), "SHARED_DATA_DIR": "", "DATA_WATCH_INTERVAL": "0",
+           "EMAIL_JOBS_DIR": str(Path(args.workdir) / ".jobs")}
+    if not args.result_cache:
+        env["MATCH_CACHE_SIZE"] = "0"  # measure ranking, not cache hits
+    print(f"🔄 {rows:,} rows: cold load")
+    cold = _run_child("load", env)
+    print(f"🔄 {rows:,} rows: warm load + serving")
+    warm = _run_child("serve", env)
+    shutil.rmtree(cache, ignore_errors=True)
+    load_keys = ["load_s", "model_load_s", "rss_before_load_mb", "peak_rss_mb", "timings"]
+    return {**info, "distinct_texts": warm["distinct_texts"],
+            "load": {"cold": {k: cold[k] for k in load_keys}, "warm": {k: warm[k] for k in load_keys}},
+            "meta": warm["meta"], "match": warm["match"], "config": warm["config"]}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_email(args):
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import AuthResult
+    except ImportError:
+        print("⚠️ aiosmtpd not installed (pip install aiosmtpd), skipping email throughput")
+        return []
+
+    class Sink:
+        received = 0
+
+        async def handle_DATA(self, server, session, envelope):
+            if args.smtp_latency_ms:
+                await asyncio.sleep(args.smtp_latency_ms / 1000)  # emulate a provider's per-message latency
+            Sink.received += 1
+            return "250 Message accepted"
+
+    logging.getLogger("mail.log").setLevel(logging.ERROR)  # aiosmtpd warns on every login
+    port = _free_port()
+    controller = Controller(Sink(), hostname="127.0.0.1", port=port, auth_require_tls=False,
+                            authenticator=lambda *a: AuthResult(success=True))
+    controller.start()
+    results = []
+    try:
+        for size in args.smtp_pool:
+            print(f"🔄 email: {args.emails} messages, pool of {size}")
+            jobs = tempfile.mkdtemp(prefix="bench-jobs-")
+            env = {"SMTP_SERVER": "127.0.0.1", "SMTP_PORT": str(port), "SMTP_EMAIL": "bench@example.com",
+                   "SMTP_PASSWORD": "bench", "SMTP_STARTTLS": "0", "SMTP_RATE_LIMIT": "0",
+                   "SMTP_POOL_SIZE": str(size), "EMAIL_JOBS_DIR": jobs}
+            try:
+                results.append(_run_child("email", env))
+            finally:
+                shutil.rmtree(jobs, ignore_errors=True)
+    finally:
+        controller.stop()
+    return results
+
+
+def run_info(args):
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "args": {k: v for k, v in vars(args).items() if not k.startswith("child") and k not in ("csv", "compare")},
+    }
+
+
+def headline(results):
+    """Flat {metric: value} view of a results file, used by --compare."""
+    out = {}
+    for c in results.get("catalogs", []):
+        n = f"{c['rows']:,} rows"
+        out[f"{n} load cold s"] = c["load"]["cold"]["load_s"]
+        out[f"{n} load warm s"] = c["load"]["warm"]["load_s"]
+        out[f"{n} peak RSS MB"] = c["load"]["warm"]["peak_rss_mb"]
+        out[f"{n} /meta p50 ms"] = c["meta"]["p50_ms"]
+        for m in c["match"]:
+            out[f"{n} /match c={m['concurrency']} p50 ms"] = m["p50_ms"]
+            out[f"{n} /match c={m['concurrency']} p99 ms"] = m["p99_ms"]
+            out[f"{n} /match c={m['concurrency']} rps"] = m["throughput_rps"]
+    for e in results.get("email", []):
+        out[f"email pool={e['pool_size']} msg/s"] = e["throughput_per_s"]
+    return out
+
+
+def print_summary(results, baseline=None):
+    new = headline(results)
+    old = headline(baseline) if baseline else {}
+    if old:
+        print(f"{'metric':<40}{'baseline':>12}{'current':>12}{'change':>9}")
+    else:
+        print(f"{'metric':<40}{'value':>12}")
+    for key, value in new.items():
+        if not old:
+            print(f"{key:<40}{value if value is not None else '-':>12}")
+        elif key in old:
+            prev = old[key]
+            change = f"{(value - prev) / prev * 100:+.1f}%" if value is not None and prev else "-"
+            print(f"{key:<40}{prev if prev is not None else '-':>12}{value if value is not None else '-':>12}{change:>9}")
+
+
+def _ints(s):
+    return [int(float(x)) for x in s.split(",") if x.strip()]
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Load, serving and email benchmarks on synthetic catalogs")
+    ap.add_argument("--sizes", type=_ints, default=[1_000, 10_000, 100_000],
+                    help="comma-separated catalog sizes (1e7 style accepted)")
+    ap.add_argument("--categories", type=int, default=10)
+    ap.add_argument("--countries", type=int, default=15)
+    ap.add_argument("--hashtags", type=int, default=200, help="extra hashtag vocabulary (drives distinct texts)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--concurrency", type=_ints, default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=200, help="/match requests per concurrency level")
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--meta-calls", type=int, default=50)
+    ap.add_argument("--outreach", action="store_true", help="include outreach generation in /match")
+    ap.add_argument("--result-cache", action="store_true", help="keep MATCH_CACHE_SIZE as configured")
+    ap.add_argument("--emails", type=int, default=500, help="messages per email run (0 skips)")
+    ap.add_argument("--smtp-pool", type=_ints, default=[1, 4])
+    ap.add_argument("--smtp-latency-ms", type=float, default=0.0)
+    ap.add_argument("--workdir", default=str(ROOT / "benchmarks" / ".scale"))
+    ap.add_argument("--out", default=None, help="results JSON (default: <workdir>/results-<commit>.json)")
+    ap.add_argument("--compare", default=None, help="baseline results JSON to diff against")
+    ap.add_argument("--child", choices=["load", "serve", "email"], help=argparse.SUPPRESS)
+    ap.add_argument("--csv", default="", help=argparse.SUPPRESS)
+    ap.add_argument("--child-out", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        out = child_email(args) if args.child == "email" else child_load(args)
+        with open(args.child_out, "w", encoding="utf-8") as f:
+            json.dump(out, f)
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = {"run": run_info(args), "catalogs": [bench_catalog(args, n) for n in args.sizes],
+               "email": bench_email(args) if args.emails > 0 else []}
+    out = args.out or os.path.join(args.workdir, f"results-{(results['run']['commit'] or 'nogit')[:12]}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(results, baseline)
+    print(f"✅ Results -> {out}")
+
+
+if __name__ == "__main__":
+    main_cli()
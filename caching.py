@@ -0,0 +1,103 @@
+# caching.py
+# Small in-process caches shared by the backend.
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache with an optional per-entry time-to-live.
+
+    `maxsize <= 0` disables caching; `ttl <= 0` means entries never expire.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl > 0 else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+class SingleFlight:
+    """Concurrent async callers asking for the same key share one computation.
+
+    The computation runs as its own task, so a caller that disconnects does not
+    cancel it for the others; `on_result` sees every successful result.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Future"] = {}
+        self.computed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                 on_result: Optional[Callable[[Any], None]] = None) -> Any:
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.computed += 1
+            fut = asyncio.ensure_future(compute())
+            self._inflight[key] = fut
+
+            def done(f):
+                self._inflight.pop(key, None)
+                if not f.cancelled() and f.exception() is None and on_result is not None:
+                    on_result(f.result())
+
+            fut.add_done_callback(done)
+        else:
+            self.shared += 1
+        return await asyncio.shield(fut)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._inflight), "computed": self.computed, "shared": self.shared}
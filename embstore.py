@@ -0,0 +1,194 @@
+# embstore.py
+# Persistent on-disk cache of text embeddings.
+#
+# Layout (next to the dataset by default):
+#   <root>/v1/<model-slug>/manifest.json
+#   <root>/v1/<model-slug>/seg-<id>.keys.npy   # S32 hex digests of the embedded text
+#   <root>/v1/<model-slug>/seg-<id>.vecs.npy   # float32 (n, D), L2-normalized
+#
+# Each flush appends a new segment and rewrites the manifest atomically, so a
+# warm restart only encodes rows whose text is new or changed.
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+STORE_VERSION = 1
+_KEY_DTYPE = "S32"
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest().encode("ascii")
+
+
+def text_keys(texts: List[str]) -> np.ndarray:
+    return np.array([text_key(t) for t in texts], dtype=_KEY_DTYPE)
+
+
+def _slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name).strip("_") or "model"
+
+
+class EmbeddingStore:
+    """Versioned embedding cache keyed on (model name, content hash of the text)."""
+
+    def __init__(self, root: str, model_name: str):
+        self.model_name = model_name
+        self.path = os.path.join(root, f"v{STORE_VERSION}", _slug(model_name))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._segments: List[str] = []
+        self._keys: np.ndarray = np.empty(0, dtype=_KEY_DTYPE)   # sorted
+        self._loc: np.ndarray = np.empty((0, 2), dtype=np.int64)  # (segment, row) per sorted key
+        self._vecs: List[np.ndarray] = []                         # memory-mapped per segment
+        self.dim: Optional[int] = None
+        self._open()
+
+    # ---- reading ----
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def _open(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if manifest.get("version") != STORE_VERSION or manifest.get("model") != self.model_name:
+            return
+
+        keys, locs, vecs, segments = [], [], [], []
+        for seg in manifest.get("segments", []):
+            try:
+                k = np.load(os.path.join(self.path, f"seg-{seg}.keys.npy"))
+                v = np.load(os.path.join(self.path, f"seg-{seg}.vecs.npy"), mmap_mode="r")
+            except (FileNotFoundError, ValueError):
+                continue
+            if k.shape[0] != v.shape[0]:
+                continue
+            seg_no = len(segments)
+            segments.append(seg)
+            vecs.append(v)
+            keys.append(k.astype(_KEY_DTYPE, copy=False))
+            locs.append(np.column_stack([np.full(k.shape[0], seg_no), np.arange(k.shape[0])]))
+        if not segments:
+            return
+
+        all_keys = np.concatenate(keys)
+        all_locs = np.concatenate(locs).astype(np.int64)
+        # later segments win on duplicate keys
+        order = np.argsort(all_keys, kind="stable")[::-1]
+        all_keys, all_locs = all_keys[order], all_locs[order]
+        _, first = np.unique(all_keys, return_index=True)
+        self._keys = all_keys[first]
+        self._loc = all_locs[first]
+        self._segments = segments
+        self._vecs = vecs
+        self.dim = int(manifest.get("dim") or vecs[0].shape[1])
+
+    def __len__(self) -> int:
+        return int(self._keys.shape[0])
+
+    def lookup(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (vectors for hits in key order, boolean hit mask)."""
+        if len(self) == 0 or keys.size == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32), np.zeros(keys.shape[0], dtype=bool)
+        pos = np.searchsorted(self._keys, keys)
+        pos_c = np.minimum(pos, len(self) - 1)
+        hit = self._keys[pos_c] == keys
+        locs = self._loc[pos_c[hit]]
+        out = np.empty((locs.shape[0], self.dim), dtype=np.float32)
+        for seg_no, mm in enumerate(self._vecs):
+            sel = np.nonzero(locs[:, 0] == seg_no)[0]
+            if sel.size:
+                out[sel] = mm[locs[sel, 1]]
+        return out, hit
+
+    # ---- writing ----
+    def append(self, keys: np.ndarray, vecs: np.ndarray):
+        """Persist a new segment and make it visible to subsequent lookups."""
+        if keys.size == 0:
+            return
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            seg = uuid.uuid4().hex[:12]
+            for suffix, arr in (("keys", keys.astype(_KEY_DTYPE)), ("vecs", vecs)):
+                final = os.path.join(self.path, f"seg-{seg}.{suffix}.npy")
+                tmp = final + ".tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, arr)
+                os.replace(tmp, final)
+
+            manifest = {
+                "version": STORE_VERSION,
+                "model": self.model_name,
+                "dim": int(vecs.shape[1]),
+                "segments": self._segments + [seg],
+            }
+            tmp = self._manifest_path() + f".{seg}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._manifest_path())
+
+            # merge the new segment in memory instead of re-reading every segment,
+            # so appending chunk after chunk during a large ingest stays cheap
+            seg_no = len(self._segments)
+            new_keys = keys.astype(_KEY_DTYPE)
+            new_locs = np.column_stack([np.full(new_keys.shape[0], seg_no), np.arange(new_keys.shape[0])])
+            all_keys = np.concatenate([new_keys, self._keys])
+            all_locs = np.concatenate([new_locs, self._loc]).astype(np.int64)
+            # np.unique keeps the first occurrence, so the new segment wins on duplicates
+            uniq, first = np.unique(all_keys, return_index=True)
+            self._vecs = self._vecs + [np.load(os.path.join(self.path, f"seg-{seg}.vecs.npy"), mmap_mode="r")]
+            self._segments = self._segments + [seg]
+            self._keys, self._loc = uniq, all_locs[first]
+            self.dim = int(vecs.shape[1])
+
+    def stats(self) -> Dict[str, object]:
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "segments": len(self._segments),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+def encode_cached(model, texts: List[str], store: Optional[EmbeddingStore],
+                  **encode_kwargs) -> Tuple[np.ndarray, int]:
+    """Encode `texts`, reusing vectors from `store` and persisting any new ones.
+
+    Returns the vectors and how many texts went through the model.
+    """
+    if store is None or not texts:
+        return np.asarray(model.encode(texts, **encode_kwargs), dtype=np.float32), len(texts)
+
+    keys = text_keys(texts)
+    cached, hit = store.lookup(keys)
+    miss_idx = np.nonzero(~hit)[0]
+    store.hits += int(hit.sum())
+    store.misses += int(miss_idx.size)
+
+    fresh = None
+    if miss_idx.size:
+        fresh = np.asarray(model.encode([texts[i] for i in miss_idx], **encode_kwargs), dtype=np.float32)
+    dim = cached.shape[1] if cached.shape[0] else fresh.shape[1]
+
+    emb = np.empty((len(texts), dim), dtype=np.float32)
+    if cached.shape[0]:
+        emb[hit] = cached
+    if fresh is not None:
+        emb[miss_idx] = fresh
+        # unique keys only: the same text may appear on many rows
+        _, first = np.unique(keys[miss_idx], return_index=True)
+        store.append(keys[miss_idx][first], fresh[first])
+    return emb, int(miss_idx.size)
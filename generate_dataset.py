@@ -1,59 +1,248 @@
 # generate_dataset.py
-import pandas as pd
-import numpy as np
-import random
+# Synthetic influencer catalog, generated in vectorized numpy chunks and streamed to disk.
+#
+#   python generate_dataset.py                                   # data/influencers_top1000.csv
+#   python generate_dataset.py --rows 10000000 --hashtags 50000 --processes 8 --out /tmp/cat-10m.parquet
+#
+# Diversity is controlled per column: --categories / --countries pick how many
+# distinct values are drawn, --hashtags sets the size of the extra tag vocabulary
+# (0 = the fixed "#<category> #influencer #trending"). Extra tags follow a Zipf
+# law (--zipf) whose ranking is rotated per category, so popular tags repeat
+# the way real ones do (embedding texts dedupe) while the long tail keeps
+# distinct texts growing with the catalog.
+#
+# Rows are drawn in fixed blocks of BLOCK_ROWS, each from its own seed stream,
+# so the output depends only on the arguments and --seed: not on --chunk-rows
+# or --processes. Memory is bounded by a few chunks per process.
+import argparse
+import multiprocessing as mp
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 
-# Set seeds for reproducibility
-random.seed(42)
-np.random.seed(42)
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pa_parquet
+except Exception:  # optional: only needed for --format parquet
+    pa = None
+    pa_parquet = None
 
-# Number of influencers to generate
-N = 1000  
+BLOCK_ROWS = 16_384
 
 # Possible attribute values
 platforms = ["Instagram", "YouTube", "TikTok", "Twitter", "LinkedIn"]
+platform_weights = [34, 26, 22, 10, 8]
 countries = ["USA", "India", "UK", "Brazil", "Germany", "Canada", "France", "Japan", "Australia", "Italy", "Spain", "Mexico", "UAE", "Singapore", "Netherlands"]
 categories = ["fashion", "tech", "fitness", "food", "travel", "beauty", "music", "gaming", "education", "finance"]
 
+# Used when more diversity is requested; extra countries are ones the backend maps to a continent
+extra_countries = ["Argentina", "Chile", "Colombia", "Peru", "Ireland", "Belgium", "Portugal", "Sweden", "Norway",
+                   "Denmark", "Poland", "China", "South Korea", "Indonesia", "Malaysia", "New Zealand",
+                   "South Africa", "Nigeria", "Egypt", "Kenya", "Morocco"]
+extra_categories = ["pets", "parenting", "sports", "art", "photography", "diy", "automotive", "health", "comedy",
+                    "lifestyle", "home decor", "gardening", "crypto", "books", "film", "science", "outdoors",
+                    "skincare", "esports", "wellness"]
+
+# Hashtag vocabulary: topics x modifiers, then numbered variants once the pairs run out
+tag_topics = ["style", "ootd", "streetwear", "gadget", "code", "ai", "startup", "workout", "gym", "yoga", "running",
+              "vegan", "recipe", "foodie", "coffee", "wanderlust", "roadtrip", "beach", "hiking", "makeup",
+              "skincare", "glow", "beats", "indie", "concert", "esports", "retro", "speedrun", "study", "edtech",
+              "money", "invest", "budget", "crypto", "pet", "dog", "cat", "mom", "dad", "family", "art", "design",
+              "photo", "film", "diy", "garden", "home", "car", "health", "mindful", "comedy", "meme", "book",
+              "science", "space", "nature", "surf", "ski", "football", "tennis"]
+tag_modifiers = ["", "daily", "tips", "life", "vibes", "review", "haul", "goals", "hacks", "pro", "club", "lab",
+                 "world", "insider", "diaries", "community", "challenge", "inspo", "talk", "101", "addict",
+                 "lover", "nation", "hub"]
+
 first_names = ["Alex","Jordan","Taylor","Chris","Jamie","Casey","Morgan","Cameron","Sam","Avery","Riley","Dakota","Rowan","Harper","Reese","Peyton","Devin","Skyler","Elliot"]
 last_names  = ["Smith","Johnson","Brown","Lee","Martinez","Davis","Garcia","Miller","Wilson","Anderson","Moore","Lopez","Clark","Lewis","Walker","Hall","Young","King","Green"]
+email_domains = ["gmail.com", "outlook.com", "yahoo.com", "influencerhub.io"]
+
+MAX_COUNTRIES = len(countries) + len(extra_countries)
+COLUMNS = ["person_name", "email", "followers", "platform", "category", "country", "hashtags"]
+
+
+def category_values(n: int):
+    """First n categories; past the named ones, numbered niches."""
+    named = categories + extra_categories
+    return named[:n] + [f"niche {i}" for i in range(len(named), n)]
+
+
+def country_values(n: int):
+    if not 1 <= n <= MAX_COUNTRIES:
+        raise ValueError(f"countries must be between 1 and {MAX_COUNTRIES}")
+    return (countries + extra_countries)[:n]
+
+
+def hashtag_values(n: int):
+    """n distinct tags: every topic with every modifier, then numbered rounds of the same."""
+    pairs = [f"#{t}{m}" for m in tag_modifiers for t in tag_topics]
+    return [pairs[i % len(pairs)] + (str(i // len(pairs)) if i >= len(pairs) else "") for i in range(n)]
+
+
+@lru_cache(maxsize=8)
+def _vocab(n_categories: int, n_countries: int, n_hashtags: int, zipf: float):
+    """Lookup arrays shared by every block (cached per process)."""
+    names = np.array([f"{f} {l}" for f in first_names for l in last_names], dtype=object)
+    users = np.array([f"{f}.{l}".lower() for f in first_names for l in last_names], dtype=object)
+    emails = np.array([f"{u}@{d}" for u in users for d in email_domains], dtype=object)
+    cats = category_values(n_categories)
+    tags = np.array([" " + t for t in hashtag_values(n_hashtags)], dtype=object)
+    cdf = np.cumsum(1.0 / np.arange(1, n_hashtags + 1) ** zipf) if n_hashtags else np.zeros(0)
+    return {
+        "names": names,
+        "emails": emails,
+        "platforms": np.array(platforms, dtype=object),
+        "platform_p": np.asarray(platform_weights, dtype=np.float64) / sum(platform_weights),
+        "categories": np.array(cats, dtype=object),
+        "countries": np.array(country_values(n_countries), dtype=object),
+        # without extra tags every row gets the original fixed ones
+        "category_tags": np.array([f"#{c.replace(' ', '')}" + ("" if n_hashtags else " #influencer #trending")
+                                   for c in cats], dtype=object),
+        "tags": tags,
+        "tag_cdf": cdf / cdf[-1] if n_hashtags else cdf,
+        # rotate the Zipf ranking per category so each niche has its own popular tags
+        "tag_offsets": (np.arange(n_categories, dtype=np.int64) * 7919) % max(n_hashtags, 1),
+    }
+
+
+def _block(seed: int, block: int, n: int, spec) -> dict:
+    rng = np.random.default_rng([seed, block])
+    v = _vocab(spec["categories"], spec["countries"], spec["hashtags"], spec["zipf"])
+    person = rng.integers(0, len(v["names"]), n)
+    category = rng.integers(0, len(v["categories"]), n)
+    cols = {
+        "person_name": v["names"][person],
+        "email": v["emails"][person * len(email_domains) + rng.integers(0, len(email_domains), n)],
+        # bounded lognormal
+        "followers": np.clip(rng.lognormal(mean=12, sigma=0.7, size=n), 1e4, 2.5e7).astype(np.int64),
+        "platform": v["platforms"][np.searchsorted(np.cumsum(v["platform_p"]), rng.random(n), side="right")
+                                   .clip(max=len(platforms) - 1)],
+        "category": v["categories"][category],
+        "country": v["countries"][rng.integers(0, len(v["countries"]), n)],
+    }
+    hashtags = v["category_tags"][category]
+    if spec["hashtags"]:
+        k = rng.integers(1, spec["max_tags"] + 1, n)
+        rank = np.searchsorted(v["tag_cdf"], rng.random((n, spec["max_tags"])), side="right")
+        ids = np.sort((rank.clip(max=spec["hashtags"] - 1) + v["tag_offsets"][category, None]) % spec["hashtags"], axis=1)
+        keep = np.arange(spec["max_tags"]) < k[:, None]
+        keep[:, 1:] &= ids[:, 1:] != ids[:, :-1]  # drop repeats within a row
+        for j in range(spec["max_tags"]):
+            hashtags = hashtags + np.where(keep[:, j], v["tags"][ids[:, j]], "")
+    cols["hashtags"] = hashtags
+    return cols
+
+
+def _chunk(seed: int, first_block: int, start: int, stop: int, spec) -> pd.DataFrame:
+    """Rows [start, stop) of the catalog, starting at block boundary `first_block`."""
+    blocks = []
+    for b in range(first_block, first_block + -(-(stop - start) // BLOCK_ROWS)):
+        blocks.append(_block(seed, b, min(BLOCK_ROWS, stop - b * BLOCK_ROWS), spec))
+    return pd.DataFrame({c: np.concatenate([blk[c] for blk in blocks]) for c in COLUMNS})
+
+
+def _spec(n_categories, n_countries, n_hashtags, max_tags, zipf):
+    country_values(n_countries)  # validate before any work is shipped to workers
+    if n_categories < 1 or n_hashtags < 0 or max_tags < 1:
+        raise ValueError("categories and max_tags must be >= 1, hashtags >= 0")
+    return {"categories": n_categories, "countries": n_countries, "hashtags": n_hashtags,
+            "max_tags": max_tags, "zipf": zipf}
+
+
+def _ranges(n: int, chunk_rows: int):
+    per = max(1, -(-chunk_rows // BLOCK_ROWS))  # whole blocks per chunk
+    for first in range(0, -(-n // BLOCK_ROWS), per):
+        yield first, first * BLOCK_ROWS, min(n, (first + per) * BLOCK_ROWS)
+
+
+def generate_chunks(n: int, seed: int = 42, n_categories: int = len(categories), n_countries: int = len(countries),
+                    n_hashtags: int = 0, max_tags: int = 3, zipf: float = 1.1, chunk_rows: int = 100_000):
+    """Yield the catalog as DataFrames of about chunk_rows rows (rounded to whole blocks)."""
+    spec = _spec(n_categories, n_countries, n_hashtags, max_tags, zipf)
+    for first, start, stop in _ranges(n, chunk_rows):
+        yield _chunk(seed, first, start, stop, spec)
+
+
+def generate(n: int, **kwargs) -> pd.DataFrame:
+    return pd.concat(list(generate_chunks(n, **kwargs)), ignore_index=True)
+
+
+# ---- Writing ----
+def _csv_chunk(seed, first, start, stop, spec) -> str:
+    # formatting is most of the cost, so workers hand back finished CSV text
+    return _chunk(seed, first, start, stop, spec).to_csv(index=False, header=start == 0)
+
+
+def _arrow_chunk(seed, first, start, stop, spec):
+    return pa.Table.from_pandas(_chunk(seed, first, start, stop, spec), preserve_index=False)
+
+
+def _produce(task, n, seed, spec, chunk_rows, processes):
+    """Chunk results in order; with processes > 1 at most 2 chunks per worker are in flight."""
+    ranges = _ranges(n, chunk_rows)
+    if processes <= 1:
+        for r in ranges:
+            yield task(seed, *r, spec)
+        return
+    with mp.get_context("spawn").Pool(processes) as pool:
+        pending = deque()
+        for r in ranges:
+            pending.append(pool.apply_async(task, (seed, *r, spec)))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def write(path, n: int, seed: int = 42, n_categories: int = len(categories), n_countries: int = len(countries),
+          n_hashtags: int = 0, max_tags: int = 3, zipf: float = 1.1, chunk_rows: int = 100_000,
+          processes: int = 1, fmt: str = None) -> int:
+    """Stream the catalog to CSV or Parquet (from the suffix unless fmt is given); returns rows written."""
+    path = Path(path)
+    fmt = fmt or ("parquet" if path.suffix == ".parquet" else "csv")
+    spec = _spec(n_categories, n_countries, n_hashtags, max_tags, zipf)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for text in _produce(_csv_chunk, n, seed, spec, chunk_rows, processes):
+                f.write(text)
+    elif fmt == "parquet":
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet output (pip install pyarrow)")
+        writer = None
+        try:
+            for table in _produce(_arrow_chunk, n, seed, spec, chunk_rows, processes):
+                if writer is None:
+                    writer = pa_parquet.ParquetWriter(str(path), table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        raise ValueError(f"Unknown format {fmt!r} (csv or parquet)")
+    return n
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate a synthetic influencer catalog")
+    ap.add_argument("--rows", type=lambda s: int(float(s)), default=1000, help="row count (1e7 style accepted)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--categories", type=int, default=len(categories), help="distinct categories")
+    ap.add_argument("--countries", type=int, default=len(countries), help=f"distinct countries (max {MAX_COUNTRIES})")
+    ap.add_argument("--hashtags", type=int, default=0, help="extra hashtag vocabulary size (0 = fixed tags)")
+    ap.add_argument("--max-tags", type=int, default=3, help="extra tags per row, at most")
+    ap.add_argument("--zipf", type=float, default=1.1, help="tag popularity skew (higher = fewer distinct texts)")
+    ap.add_argument("--chunk-rows", type=int, default=100_000)
+    ap.add_argument("--processes", type=int, default=1)
+    ap.add_argument("--format", choices=["csv", "parquet"], default=None, help="default: from the --out suffix")
+    ap.add_argument("--out", default="data/influencers_top1000.csv")
+    args = ap.parse_args()
 
-# Function to generate random influencer name and email
-def make_person():
-    name = f"{random.choice(first_names)} {random.choice(last_names)}"
-    username = name.lower().replace(" ", ".")
-    email_domain = random.choice(["gmail.com", "outlook.com", "yahoo.com", "influencerhub.io"])
-    email = f"{username}@{email_domain}"
-    return name, email
-
-# Generate dataset
-rows = []
-for _ in range(N):
-    name, email = make_person()
-    platform = random.choices(platforms, weights=[34,26,22,10,8], k=1)[0]
-    country = random.choice(countries)
-    category = random.choice(categories)
-
-    # Generate followers (bounded lognormal)
-    followers = int(np.clip(np.random.lognormal(mean=12, sigma=0.7), 1e4, 2.5e7))
-
-    hashtags = " ".join([f"#{category}", "#influencer", "#trending"])
-
-    rows.append({
-        "person_name": name,
-        "email": email,
-        "followers": followers,
-        "platform": platform,
-        "category": category,
-        "country": country,
-        "hashtags": hashtags
-    })
-
-# Save to CSV
-df = pd.DataFrame(rows)
-Path("data").mkdir(parents=True, exist_ok=True)
-output_path = Path("data/influencers_top1000.csv")
-df.to_csv(output_path, index=False)
-
-print(f"✅ Generated {len(df)} influencer records -> {output_path}")
+    n = write(args.out, args.rows, seed=args.seed, n_categories=args.categories, n_countries=args.countries,
+              n_hashtags=args.hashtags, max_tags=args.max_tags, zipf=args.zipf, chunk_rows=args.chunk_rows,
+              processes=args.processes, fmt=args.format)
+    print(f"✅ Generated {n} influencer records -> {args.out}")
@@ -0,0 +1,154 @@
+# ingest.py
+# Compile the influencer CSV into a memory-mappable dataset artifact (see artifact.py).
+#
+#   python ingest.py                      # DATA_PATH -> <DATA_PATH without .csv>.artifact
+#   python ingest.py --csv big.csv --out big.artifact
+#   python ingest.py --publish /dev/shm/influencers   # new generation for SHARED_DATA_DIR workers
+#   python ingest.py --processes 8 --batch-size 128   # encode the corpus on 8 worker processes
+#
+# The backend loads the artifact at startup instead of parsing and encoding the
+# CSV, as long as it was built with the same EMB_MODEL from the CSV on disk.
+# With --publish this process is the single loader: workers attach the new
+# generation on their next poll, and texts already in the previous generation
+# are not re-encoded.
+#
+# Before compiling, the corpus is encoded in a streaming pass: the CSV is read in
+# chunks, texts missing from the embedding cache (EMB_CACHE_DIR) are encoded on a
+# process pool and appended to the cache as one segment per chunk. Peak memory is
+# one chunk plus the cache's key index, and an interrupted run resumes where it
+# stopped.
+#
+# The compile pass streams the CSV again: each cleaned chunk is written as one
+# Arrow record batch, and the float32 vectors are copied from the cache into a
+# memory-mapped embeddings.npy. Besides one chunk, memory holds the distinct
+# texts and a few integers per row (filter codes; row hashes go to disk).
+import argparse
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import artifact
+import main
+from embstore import encode_cached, text_keys
+from retrieval import FilterIndex
+
+_FILTER_COLUMNS = ("continent", "platform", "category")
+_EMB_BLOCK = 8_192  # texts copied from the cache per block (~12 MB of float32 at dim 384)
+
+
+def encode_corpus(csv_path: str, chunk_rows: int = 100_000, batch_size: int = 64, processes: int = 1):
+    """Stream `csv_path` and fill the embedding cache; returns counters for the report."""
+    store = main._get_emb_store()
+    if store is None:
+        raise SystemExit("The streaming encode pass writes to the embedding cache; set EMB_CACHE_DIR.")
+    model = main._get_model()
+    pool = None  # started on the first chunk with misses: a warm cache never pays for the workers
+    rows = encoded = 0
+    t0 = time.perf_counter()
+    try:
+        reader = pd.read_csv(csv_path, chunksize=chunk_rows, usecols=["category", "hashtags", "platform"])
+        for chunk in reader:
+            texts = pd.unique(np.asarray(main._build_texts(chunk), dtype=object))
+            keys = text_keys(list(texts))
+            _, hit = store.lookup(keys)
+            todo = np.nonzero(~hit)[0]
+            if todo.size:
+                batch = [texts[i] for i in todo]
+                if pool is None and processes > 1:
+                    pool = model.start_multi_process_pool(["cpu"] * processes)
+                if pool is not None:
+                    vecs = model.encode_multi_process(batch, pool, batch_size=batch_size, normalize_embeddings=True)
+                else:
+                    vecs = model.encode(batch, batch_size=batch_size, normalize_embeddings=True)
+                store.append(keys[todo], np.asarray(vecs, dtype=np.float32))
+            rows += len(chunk)
+            encoded += int(todo.size)
+            elapsed = time.perf_counter() - t0
+            print(f"⏳ {rows:,} rows, {encoded:,} texts encoded, {rows / elapsed:,.0f} rows/s")
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+    elapsed = time.perf_counter() - t0
+    return {"encode_pass_s": round(elapsed, 3), "rows": rows, "texts_encoded": encoded,
+            "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else None}
+
+
+def compile_corpus(csv_path: str, out: str, chunk_rows: int = 100_000) -> Dict[str, Any]:
+    """Stream `csv_path` into an artifact at `out`, with vectors taken from the embedding cache."""
+    store = main._get_emb_store()
+    source = main._source_stamp(csv_path)
+    w = artifact.Writer(out)
+    try:
+        text_ids: Dict[str, int] = {}
+        filter_codes: Dict[str, List[np.ndarray]] = {col: [] for col in _FILTER_COLUMNS}
+        for chunk in main._iter_csv(csv_path, chunk_rows):
+            codes, uniq = main._chunk_texts(chunk)
+            ids = np.fromiter((text_ids.setdefault(t, len(text_ids)) for t in uniq), dtype=np.int32, count=len(uniq))
+            cat_codes = w.append_rows(chunk, ids[codes])
+            w.append_array("row_hashes", pd.util.hash_pandas_object(chunk[main._REQUIRED_COLUMNS], index=False).to_numpy())
+            for col in _FILTER_COLUMNS:
+                filter_codes[col].append(cat_codes[col])
+        if not text_ids:
+            raise ValueError(f"No rows in {csv_path}")
+        texts = list(text_ids)
+        del text_ids
+
+        # float32 exactly as encoded: EMB_QUANT / RETRIEVAL_MODE are applied by each loader
+        emb = None
+        model = main._get_model()
+        for start in range(0, len(texts), _EMB_BLOCK):
+            block, _ = encode_cached(model, texts[start:start + _EMB_BLOCK], store, normalize_embeddings=True)
+            if emb is None:
+                emb = w.array("embeddings", (len(texts), block.shape[1]))
+            emb[start:start + len(block)] = block
+        return w.close(texts, main.EMB_MODEL, source, _filter_arrays(w, filter_codes))
+    except BaseException:
+        w.abort()
+        raise
+
+
+def _filter_arrays(w: artifact.Writer, filter_codes: Dict[str, List[np.ndarray]]) -> Dict[str, Dict[str, Any]]:
+    # FilterIndex posting lists, with values sorted as the CSV loader sorts them
+    cols = {}
+    for col, parts in filter_codes.items():
+        values = w.dictionary(col)
+        cat = pd.Categorical.from_codes(np.concatenate(parts), categories=values)
+        cols[col] = cat.reorder_categories(sorted(values))
+    return FilterIndex(pd.DataFrame(cols), columns=_FILTER_COLUMNS).to_arrays()
+
+
+def run():
+    ap = argparse.ArgumentParser(description="Compile the influencer CSV into a columnar dataset artifact")
+    ap.add_argument("--csv", default=main.DATA_PATH, help="source CSV (default: DATA_PATH)")
+    ap.add_argument("--out", default=None, help="artifact directory (default: DATA_ARTIFACT or <csv>.artifact)")
+    ap.add_argument("--publish", metavar="DIR", default=None,
+                    help="publish as the next generation under DIR (the workers' SHARED_DATA_DIR)")
+    ap.add_argument("--chunk-rows", type=int, default=100_000, help="CSV rows per streamed chunk")
+    ap.add_argument("--batch-size", type=int, default=64, help="texts per encoder batch")
+    ap.add_argument("--processes", type=int, default=1,
+                    help="encoder processes (1 = encode in this process; each extra one loads its own model)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    stats = encode_corpus(args.csv, args.chunk_rows, args.batch_size, max(1, args.processes))
+    print(f"✅ Encoded corpus: {stats}")
+
+    t1 = time.perf_counter()
+
+    def write(out):
+        return compile_corpus(args.csv, out, args.chunk_rows)
+
+    if args.publish:
+        out = artifact.publish(args.publish, write)
+    else:
+        out = args.out or main._artifact_path(args.csv)
+        write(out)
+    manifest = artifact.read_manifest(out)
+    print(f"✅ Wrote {manifest['rows']} rows ({manifest['distinct_texts']} distinct texts, dim {manifest['dim']}) "
+          f"-> {out} in {time.perf_counter() - t0:.2f}s (compile {time.perf_counter() - t1:.2f}s)")
+
+
+if __name__ == "__main__":
+    run()
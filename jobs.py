@@ -0,0 +1,272 @@
+# jobs.py
+# Background queue for bulk outreach sends.
+#
+# Each job is persisted as data/.jobs/<job_id>.json, rewritten atomically when
+# its status changes. Recipient updates are appended to <job_id>.log as JSON
+# lines and folded into the .json when the job completes, so a restart resumes
+# unfinished jobs and never re-sends recipients already marked "sent".
+# Completed jobs are dropped from memory and disk after `retention` seconds.
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+import profiling
+
+PENDING, SENT, FAILED = "pending", "sent", "failed"
+QUEUED, RUNNING, COMPLETED = "queued", "running", "completed"
+
+
+class EmailJobQueue:
+    """Persistent job queue; `send(email, name, subject, message)` raises on failure."""
+
+    def __init__(self, root: str, send: Callable[[str, str, str, str], Any], executor: Executor,
+                 workers: int = 1, max_attempts: int = 3, backoff: float = 2.0, retention: float = 86400.0):
+        self.root = root
+        self.send = send
+        self.executor = executor
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = backoff
+        self.retention = retention
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._logs: Dict[str, Any] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+
+    # ---- lifecycle ----
+    def start(self):
+        # reading old jobs back happens off the startup path; workers pick them up as they are queued
+        t = threading.Thread(target=self._resume, name="email-job-resume", daemon=True)
+        t.start()
+        self._threads.append(t)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"email-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _resume(self):
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            names = []  # nothing was ever submitted here
+        for fname in names:
+            if not fname.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.root, fname), "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._replay(job)
+            self._jobs[job["job_id"]] = job
+            self._locks[job["job_id"]] = threading.Lock()
+            if job["status"] in (QUEUED, RUNNING):
+                job["resumed"] = job.get("resumed", 0) + 1
+                self._queue.put(job["job_id"])
+        self._prune()
+
+    def _replay(self, job: Dict[str, Any]):
+        # apply the recipient updates logged since the last snapshot; a torn last line is ignored
+        try:
+            with open(self._path(job["job_id"], ".log"), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        update = json.loads(line)
+                    except ValueError:
+                        continue
+                    job["recipients"][update.pop("i")].update(update)
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Forget completed jobs that finished more than `retention` seconds ago (<= 0 keeps them)."""
+        if self.retention <= 0:
+            return
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] == COMPLETED and (job["finished_at"] or 0) < cutoff:
+                self._jobs.pop(job_id, None)
+                self._locks.pop(job_id, None)
+                for ext in (".json", ".log"):
+                    try:
+                        os.remove(self._path(job_id, ext))
+                    except OSError:
+                        pass
+
+    # ---- API ----
+    def submit(self, recipients: List[Dict[str, str]], subject: str, campaign_brief: Optional[str] = None,
+               profile: bool = False) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "subject": subject,
+            "campaign_brief": campaign_brief,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "recipients": [
+                {
+                    "name": r.get("name", ""),
+                    "email": r.get("email", ""),
+                    "message": r.get("message", ""),
+                    "status": PENDING,
+                    "attempts": 0,
+                    "error": None,
+                    "sent_at": None,
+                }
+                for r in recipients
+            ],
+        }
+        if profile:
+            # summed per-stage send time (email_build, smtp_connect/login/send, ...) across recipients
+            job["profile"] = {"stages_s": {}, "stage_calls": {}}
+        self._prune()
+        self._jobs[job_id] = job
+        self._locks[job_id] = threading.Lock()
+        self._save(job)
+        self._queue.put(job_id)
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job, lock = self._jobs.get(job_id), self._locks.get(job_id)
+        if job is None or lock is None:
+            return None
+        with lock:
+            recips = job["recipients"]
+            sent = sum(1 for r in recips if r["status"] == SENT)
+            failed = sum(1 for r in recips if r["status"] == FAILED)
+            started = job["started_at"]
+            elapsed = ((job["finished_at"] or time.time()) - started) if started else 0.0
+            results = []
+            for r in recips:
+                item = {"email": r["email"] or "unknown", "name": r["name"], "status": r["status"],
+                        "attempts": r["attempts"]}
+                if r["error"]:
+                    item["error"] = r["error"]
+                results.append(item)
+            return {
+                "job_id": job_id,
+                "status": job["status"],
+                "total": len(recips),
+                "success": sent,
+                "failed": failed,
+                "pending": len(recips) - sent - failed,
+                "retries": sum(max(0, r["attempts"] - 1) for r in recips),
+                "elapsed_s": round(elapsed, 3),
+                "throughput_per_s": round(sent / elapsed, 3) if elapsed > 0 else None,
+                "resumed": job.get("resumed", 0),
+                "results": results,
+                **({"profile": {
+                    "stages_ms": {k: round(v * 1000, 3) for k, v in job["profile"]["stages_s"].items()},
+                    "stage_calls": dict(job["profile"]["stage_calls"]),
+                }} if "profile" in job else {}),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in list(self._jobs.values()):
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"queued": self._queue.qsize(), "jobs": counts}
+
+    # ---- workers ----
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                print(f"Email job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str):
+        job = self._jobs[job_id]
+        lock = self._locks[job_id]
+        with lock:
+            job["status"] = RUNNING
+            job["started_at"] = job["started_at"] or time.time()
+            self._save(job)
+            self._logs[job_id] = open(self._path(job_id, ".log"), "a", encoding="utf-8")
+
+        try:
+            for attempt in range(self.max_attempts):
+                todo = [(i, r) for i, r in enumerate(job["recipients"]) if r["status"] == PENDING]
+                if not todo:
+                    break
+                if attempt:
+                    time.sleep(self.backoff * (2 ** (attempt - 1)))
+                last = attempt == self.max_attempts - 1
+                list(self.executor.map(lambda item: self._deliver(job, lock, *item, last=last), todo))
+        finally:
+            with lock:
+                self._logs.pop(job_id).close()
+
+        with lock:
+            job["status"] = COMPLETED
+            job["finished_at"] = time.time()
+            # the snapshot now holds every update: the log is no longer needed
+            self._save(job)
+            os.remove(self._path(job_id, ".log"))
+        self._prune()
+
+    def _deliver(self, job: Dict[str, Any], lock: threading.Lock, i: int, r: Dict[str, Any], last: bool):
+        if not r["email"] or not r["message"]:
+            with lock:
+                r["status"], r["error"] = FAILED, "Missing email or message"
+                self._record(job, i, r)
+            return
+        try:
+            if "profile" not in job:
+                self.send(r["email"], r["name"], job["subject"], r["message"])
+            else:
+                self._send_profiled(job, lock, r)
+        except Exception as e:
+            with lock:
+                r["attempts"] += 1
+                r["error"] = getattr(e, "detail", None) or str(e)
+                if last:
+                    r["status"] = FAILED
+                self._record(job, i, r)
+            return
+        with lock:
+            r["attempts"] += 1
+            r["status"], r["error"], r["sent_at"] = SENT, None, time.time()
+            self._record(job, i, r)
+
+    def _send_profiled(self, job: Dict[str, Any], lock: threading.Lock, r: Dict[str, Any]):
+        prof = profiling.RequestProfile()
+        try:
+            with profiling.activate(prof), prof.stage("send"):
+                self.send(r["email"], r["name"], job["subject"], r["message"])
+        finally:
+            with lock:
+                totals = job["profile"]
+                for stage, seconds in prof.stages.items():
+                    totals["stages_s"][stage] = totals["stages_s"].get(stage, 0.0) + seconds
+                    totals["stage_calls"][stage] = totals["stage_calls"].get(stage, 0) + prof.counts[stage]
+
+    def _record(self, job: Dict[str, Any], i: int, r: Dict[str, Any]):
+        # one appended line per recipient update (caller holds the job lock)
+        update = {"i": i, "status": r["status"], "attempts": r["attempts"], "error": r["error"], "sent_at": r["sent_at"]}
+        log = self._logs[job["job_id"]]
+        log.write(json.dumps(update) + "\n")
+        log.flush()
+
+    def _path(self, job_id: str, ext: str) -> str:
+        return os.path.join(self.root, job_id + ext)
+
+    def _save(self, job: Dict[str, Any]):
+        # the directory appears with the first job, not when the queue is constructed (e.g. on import)
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(job["job_id"], ".json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
@@ -0,0 +1,177 @@
+# mailer.py
+# Pooled, authenticated SMTP sessions shared by the email endpoints.
+import queue
+import smtplib
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+from typing import Callable, Dict, Optional
+
+# Conservative default send rates (messages/second) for common providers;
+# SMTP_RATE_LIMIT overrides. Unknown hosts are not throttled.
+PROVIDER_RATE_LIMITS = {
+    "smtp.gmail.com": 2.0,
+    "smtp-mail.outlook.com": 0.5,
+    "smtp.office365.com": 0.5,
+    "smtp.mail.yahoo.com": 0.5,
+}
+
+# Errors after which a session is considered dead and is reopened
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0 disables)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class SMTPPool:
+    """Up to `size` logged-in SMTP sessions, reused across messages and reopened when they drop.
+
+    `observe(stage, seconds)` is called for connect / starttls / login / send timings.
+    """
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "", size: int = 4,
+                 starttls: bool = True, timeout: float = 30.0, max_idle: float = 60.0,
+                 rate_limit: Optional[float] = None, retries: int = 1,
+                 observe: Optional[Callable[[str, float], None]] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = max(1, int(size))
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.retries = max(0, int(retries))
+        self.observe = observe or (lambda stage, seconds: None)
+        if rate_limit is None:
+            rate_limit = PROVIDER_RATE_LIMITS.get(host.lower(), 0.0)
+        self.limiter = RateLimiter(rate_limit)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reconnects = 0
+        self.sent = 0
+        self.failed = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        t0 = time.perf_counter()
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.ehlo()
+            t1 = time.perf_counter()
+            self.observe("connect", t1 - t0)
+            if self.starttls:
+                conn.starttls()
+                conn.ehlo()
+                t0, t1 = t1, time.perf_counter()
+                self.observe("starttls", t1 - t0)
+            if self.username:
+                conn.login(self.username, self.password)
+                self.observe("login", time.perf_counter() - t1)
+        except Exception:
+            _close(conn)
+            raise
+        with self._lock:
+            self.connects += 1
+        return conn
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used <= self.max_idle:
+                return conn
+            # the server has probably timed this one out already
+            _close(conn)
+
+    @contextmanager
+    def session(self):
+        with self._slots:
+            conn = self._checkout()
+            try:
+                yield conn
+            except smtplib.SMTPResponseException:
+                # the server rejected this message but the session is still usable
+                self._idle.put((conn, time.monotonic()))
+                raise
+            except Exception:
+                _close(conn)
+                raise
+            self._idle.put((conn, time.monotonic()))
+
+    def send(self, msg: Message):
+        """Send one message, reopening the session and retrying if the connection dropped."""
+        self.limiter.wait()
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session() as conn:
+                    t0 = time.perf_counter()
+                    conn.send_message(msg)
+                    self.observe("send", time.perf_counter() - t0)
+                with self._lock:
+                    self.sent += 1
+                return
+            except _CONNECTION_ERRORS:
+                if attempt == self.retries:
+                    with self._lock:
+                        self.failed += 1
+                    raise
+                with self._lock:
+                    self.reconnects += 1
+                # idle sessions opened alongside the dead one are likely gone too
+                self.close()
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close(conn)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "host": self.host,
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "sent": self.sent,
+            "failed": self.failed,
+            "rate_limit": round(1.0 / self.limiter.interval, 3) if self.limiter.interval else None,
+        }
+
+
+def _close(conn: smtplib.SMTP):
+    try:
+        conn.quit()
+    except Exception:
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -1,38 +1,147 @@
 # main.py
+import time
+_IMPORT_T0 = time.perf_counter()
+
+import asyncio
+import contextvars
+import hmac
+import json
 import os
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+from pandas.api.types import union_categoricals
+try:
+    import pyarrow as pa
+except Exception:  # optional: only speeds up categorical -> string conversion
+    pa = None
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from starlette.middleware.cors import CORSMiddleware
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-# Optional Gemini (for outreach). Safe to omit if no key.
-try:
-    from google import genai  # google-genai >= 0.5.x
-except Exception:
-    genai = None
+import artifact
+import profiling
+from admission import AdmissionControl, Overloaded
+from batcher import MicroBatcher
+from caching import SingleFlight, TTLCache
+from embstore import EmbeddingStore, encode_cached
+from jobs import EmailJobQueue
+from mailer import SMTPPool
+from metrics import REGISTRY
+from retrieval import FilterIndex, as_float32, build_retriever, exact_similarity, quantize
 
 load_dotenv()
 
 DATA_PATH = os.getenv("DATA_PATH", "./data/influencers_top1000.csv")
+# Compiled columnar dataset (see ingest.py); defaults to <DATA_PATH without .csv>.artifact
+DATA_ARTIFACT = os.getenv("DATA_ARTIFACT", "")
+# Rows per chunk when parsing, embedding and hashing the CSV
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+# Generations published by `ingest.py --publish DIR`; every worker memory-maps the current one
+SHARED_DATA_DIR = os.getenv("SHARED_DATA_DIR", "")
+# Poll DATA_PATH (or SHARED_DATA_DIR) every N seconds and hot-reload on change (0 = only via POST /reload)
+DATA_WATCH_INTERVAL = float(os.getenv("DATA_WATCH_INTERVAL", "5" if SHARED_DATA_DIR else "0"))
 EMB_MODEL = os.getenv("EMB_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Persistent embedding cache; set to "" to disable
+EMB_CACHE_DIR = os.getenv("EMB_CACHE_DIR", os.path.join(os.path.dirname(DATA_PATH) or ".", ".emb_cache"))
+# Brief -> query vector LRU cache (TTL in seconds, 0 = never expire)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+# Concurrent query encodes are coalesced for up to N ms / M briefs per model call (0 ms = no batching)
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "2"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "32"))
+# Retrieval engine: "exact" (brute force) or "ivf" (approximate; recall tuned via IVF_NPROBE)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "exact")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = sqrt(distinct texts)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+# Compact in-memory representation: categorical columns, and "float16" / "int8" embeddings
+COMPACT_MODE = os.getenv("COMPACT_MODE", "0").lower() in ("1", "true", "yes")
+EMB_QUANT = os.getenv("EMB_QUANT", "none")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Outreach generation: shared worker threads, and max in-flight LLM calls per request
+OUTREACH_WORKERS = int(os.getenv("OUTREACH_WORKERS", "16"))
+OUTREACH_CONCURRENCY = int(os.getenv("OUTREACH_CONCURRENCY", "4"))
+# /match admission: ranking slots, waiting requests beyond them, max wait (s) before a 503
+MATCH_MAX_INFLIGHT = int(os.getenv("MATCH_MAX_INFLIGHT", "32"))
+MATCH_MAX_QUEUE = int(os.getenv("MATCH_MAX_QUEUE", "64"))
+MATCH_QUEUE_TIMEOUT = float(os.getenv("MATCH_QUEUE_TIMEOUT", "2"))
+# Threads for encoding + scoring (default: one per ranking slot)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(MATCH_MAX_INFLIGHT)))
+# Per-stage timeouts in seconds: ranking fails with 504, a slow outreach message falls back to the template
+RANK_TIMEOUT = float(os.getenv("RANK_TIMEOUT", "10"))
+OUTREACH_TIMEOUT = float(os.getenv("OUTREACH_TIMEOUT", "15"))
+# /match result cache (entries, 0 disables); rankings and generated outreach expire separately (seconds)
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", "512"))
+MATCH_CACHE_TTL = float(os.getenv("MATCH_CACHE_TTL", "600"))
+OUTREACH_CACHE_TTL = float(os.getenv("OUTREACH_CACHE_TTL", "1800"))
+# Max briefs per POST /match/batch
+MATCH_BATCH_MAX = int(os.getenv("MATCH_BATCH_MAX", "100"))
 
 # Email configuration
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_EMAIL = os.getenv("SMTP_EMAIL", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no")
+# Reused SMTP sessions = max parallel sends; rate in messages/second (unset = provider default)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_RATE_LIMIT = float(os.getenv("SMTP_RATE_LIMIT")) if os.getenv("SMTP_RATE_LIMIT") else None
+# Background send jobs (persisted so restarts resume without re-sending)
+EMAIL_JOBS_DIR = os.getenv("EMAIL_JOBS_DIR", os.path.join(os.path.dirname(DATA_PATH) or ".", ".jobs"))
+EMAIL_JOB_WORKERS = int(os.getenv("EMAIL_JOB_WORKERS", "1"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "3"))
+EMAIL_JOB_RETENTION = float(os.getenv("EMAIL_JOB_RETENTION", "86400"))
+
+# Profiling: requests with `X-Profile: 1` (or ?profile=1) and a matching `X-Admin-Token` get a stage
+# breakdown; `cprofile` instead of 1 also saves a cProfile dump under PROFILE_DIR. Unset token = disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(DATA_PATH) or ".", ".profiles"))
+
+# ---- Startup: heavy work happens in a background warm-up, not at import ----
+_ready = threading.Event()
+_startup: Dict[str, Any] = {"state": "starting", "error": None, "timings": {}}
+
+def _warm_up():
+    t0 = time.perf_counter()
+    try:
+        global _data
+        _get_model()
+        _data = _load_dataset(DATA_PATH, None, _startup["timings"])
+    except Exception as e:
+        _startup.update(state="failed", error=f"{type(e).__name__}: {e}")
+        print(f"❌ Warm-up failed: {_startup['error']}")
+        return
+    _startup["timings"]["warm_up_s"] = round(time.perf_counter() - t0, 3)
+    _startup["state"] = "ready"
+    _ready.set()
+    print(f"✅ Ready in {_startup['timings']['warm_up_s']}s: {_startup['timings']}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _email_jobs.start()
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    if DATA_WATCH_INTERVAL > 0:
+        threading.Thread(target=_watch_dataset, args=(DATA_WATCH_INTERVAL,), name="data-watch", daemon=True).start()
+    yield
+    if _smtp_pool is not None:
+        _smtp_pool.close()
+
+def _require_ready():
+    if not _ready.is_set():
+        detail = "Service failed to start." if _startup["state"] == "failed" else "Service is warming up, retry shortly."
+        raise HTTPException(503, detail, headers={"Retry-After": "5"})
 
 app = FastAPI(
-    title="🌍 Influencer Fit Agent (CSV: person_name,email,followers,platform,category,country,hashtags)"
+    title="🌍 Influencer Fit Agent (CSV: person_name,email,followers,platform,category,country,hashtags)",
+    lifespan=lifespan,
 )
 
 # CORS so Streamlit (localhost or deployed) can call this
@@ -44,6 +153,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def _observe_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # label by route template (e.g. /send-emails/{job_id}), not the raw path
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        _request_seconds.observe(time.perf_counter() - t0, endpoint=route)
+        _requests_total.inc(endpoint=route, status=status)
+
 class MatchRequest(BaseModel):
     brief: str
     continent: Optional[str] = None
@@ -53,6 +176,18 @@ class MatchRequest(BaseModel):
     top_k: Optional[int] = 5
     user_name: Optional[str] = None
     company_name: Optional[str] = None
+    outreach: bool = True  # False = ranking only
+
+class BatchMatchRequest(BaseModel):
+    briefs: List[str]
+    continent: Optional[str] = None
+    platform: Optional[str] = None
+    category: Optional[str] = None
+    max_followers: Optional[int] = 1_000_000
+    top_k: Optional[int] = 5
+    user_name: Optional[str] = None
+    company_name: Optional[str] = None
+    outreach: bool = False
 
 class EmailRequest(BaseModel):
     recipients: List[Dict[str, str]]  # List of {"name": "...", "email": "...", "message": "..."}
@@ -60,9 +195,84 @@ class EmailRequest(BaseModel):
     campaign_brief: Optional[str] = None
 
 # ---- Load model & dataset once ----
-_model = SentenceTransformer(EMB_MODEL)
-_df: Optional[pd.DataFrame] = None
-_embeddings: Optional[np.ndarray] = None  # shape: (N, D) float32
+_model = None
+_model_lock = threading.Lock()
+
+class Dataset:
+    """Immutable snapshot of everything a request reads; reloads swap the whole object at once."""
+
+    def __init__(self, version: int, df: pd.DataFrame, texts: pd.Index, embeddings: np.ndarray,
+                 emb_index: np.ndarray, filters: FilterIndex, retriever, row_hashes: np.ndarray,
+                 source: Dict[str, Any], frame_bytes: int = 0):
+        self.version = version
+        self.df = df
+        self.texts = texts                # distinct embedding texts, aligned with `embeddings`
+        self.embeddings = embeddings      # shape: (U, D) float32, one row per distinct text
+        self.emb_index = emb_index        # shape: (N,) int32, row -> index into embeddings
+        self.filters = filters            # continent / platform / category posting lists
+        self.retriever = retriever        # see retrieval.py
+        self.row_hashes = row_hashes      # shape: (N,) uint64, content hash per row (for reload diffs)
+        self.source = source              # path / mtime / size of the file it was built from
+        self.frame_bytes = frame_bytes    # deep memory_usage of df, measured once at build time
+        self.loaded_at = time.time()
+
+_data: Optional[Dataset] = None
+_reload_lock = threading.Lock()
+_last_reload: Optional[Dict[str, Any]] = None
+_emb_store: Optional[EmbeddingStore] = None
+_emb_store_lock = threading.Lock()
+_query_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+# Keys include the dataset version, so a reload never serves stale rankings
+_rank_cache = TTLCache(MATCH_CACHE_SIZE, MATCH_CACHE_TTL)
+_outreach_cache = TTLCache(MATCH_CACHE_SIZE, OUTREACH_CACHE_TTL)
+_single_flight = SingleFlight()
+
+# ---- Metrics (GET /metrics) ----
+_stage_seconds = REGISTRY.histogram(
+    "influencer_stage_seconds", "Time spent per pipeline stage (filter, encode, retrieve, score, records, "
+    "outreach_llm)", ["stage"])
+_smtp_seconds = REGISTRY.histogram("influencer_smtp_seconds", "SMTP connect / starttls / login / send time", ["stage"])
+_request_seconds = REGISTRY.histogram("influencer_request_seconds", "Request latency by route", ["endpoint"])
+_requests_total = REGISTRY.counter("influencer_requests_total", "Requests by route and status", ["endpoint", "status"])
+_outreach_total = REGISTRY.counter(
+    "influencer_outreach_messages_total", "Outreach messages: generated by the LLM, fallback after an LLM "
+    "failure or timeout, template when no LLM is configured", ["result"])
+_emails_total = REGISTRY.counter("influencer_emails_total", "Emails handed to SMTP by result", ["result"])
+
+def _stage(name: str):
+    prof = profiling.current()
+    if prof is None:
+        return _stage_seconds.time(stage=name)
+    return prof.stage(name, _stage_seconds)
+
+def _observe_smtp(stage: str, seconds: float):
+    _smtp_seconds.observe(seconds, stage=stage)
+    prof = profiling.current()
+    if prof is not None:
+        prof.add("smtp_" + stage, seconds)
+
+def _cache_samples(field: str):
+    def collect():
+        caches = {"query": _query_cache, "ranking": _rank_cache, "outreach": _outreach_cache,
+                  "embedding": _emb_store}
+        return [({"cache": name}, getattr(c, field)) for name, c in caches.items() if c is not None]
+    return collect
+
+REGISTRY.collect("influencer_cache_hits_total", "Cache hits", _cache_samples("hits"), type="counter")
+REGISTRY.collect("influencer_cache_misses_total", "Cache misses", _cache_samples("misses"), type="counter")
+REGISTRY.collect("influencer_shed_total", "Requests / LLM calls rejected by admission control", lambda: [
+    ({"pool": "match"}, _match_admission.shed + _match_admission.timed_out),
+    ({"pool": "llm"}, _llm_slots.shed + _llm_slots.timed_out)], type="counter")
+REGISTRY.collect("influencer_in_flight", "Requests / LLM calls holding an admission slot", lambda: [
+    ({"pool": "match"}, _match_admission.stats()["in_flight"]), ({"pool": "llm"}, _llm_slots.stats()["in_flight"])])
+REGISTRY.collect("influencer_query_batches_total", "Batched query-encoder calls",
+                 lambda: [({}, _query_batcher.batches)], type="counter")
+REGISTRY.collect("influencer_query_batch_items_total", "Briefs encoded through the batcher",
+                 lambda: [({}, _query_batcher.items)], type="counter")
+REGISTRY.collect("influencer_query_batch_wait_seconds_total", "Summed queue wait of batched briefs",
+                 lambda: [({}, _query_batcher.wait_s)], type="counter")
+REGISTRY.collect("influencer_dataset_rows", "Rows in the live dataset snapshot",
+                 lambda: [({}, _data.df.shape[0] if _data is not None else None)])
 
 _CONTINENT_MAP = {
     "usa":"North America","united states":"North America","canada":"North America","mexico":"North America",
@@ -76,10 +286,28 @@ _CONTINENT_MAP = {
     "south africa":"Africa","nigeria":"Africa","egypt":"Africa","kenya":"Africa","morocco":"Africa",
 }
 
-def _country_to_continent(country: str) -> str:
-    if not isinstance(country, str):
-        return "Other"
-    return _CONTINENT_MAP.get(country.strip().lower(), "Other")
+def _get_model():
+    # sentence-transformers (and torch) are imported on first use only
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                t0 = time.perf_counter()
+                from sentence_transformers import SentenceTransformer
+                _startup["timings"]["model_import_s"] = round(time.perf_counter() - t0, 3)
+                t0 = time.perf_counter()
+                _model = SentenceTransformer(EMB_MODEL)
+                _startup["timings"]["model_load_s"] = round(time.perf_counter() - t0, 3)
+    return _model
+
+def _get_emb_store() -> Optional[EmbeddingStore]:
+    # opened on first encode (maps every segment), not at import
+    global _emb_store
+    if _emb_store is None and EMB_CACHE_DIR:
+        with _emb_store_lock:
+            if _emb_store is None:
+                _emb_store = EmbeddingStore(EMB_CACHE_DIR, EMB_MODEL)
+    return _emb_store
 
 def _build_texts(df: pd.DataFrame) -> List[str]:
     # text used for embeddings (no bio/engagement in this schema)
@@ -90,128 +318,578 @@ def _build_texts(df: pd.DataFrame) -> List[str]:
     # Edge-case: empty strings (still OK for encoder)
     return texts
 
-def _load_dataset():
-    global _df, _embeddings
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"Dataset not found at {DATA_PATH}.")
+_REQUIRED_COLUMNS = ["person_name", "email", "followers", "platform", "category", "country", "hashtags"]
+
+def _source_stamp(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": path, "mtime": st.st_mtime, "size": st.st_size}
+
+def _artifact_path(csv_path: str) -> str:
+    return DATA_ARTIFACT or artifact.default_path(csv_path)
+
+def _artifact_is_current(path: str, csv_path: Optional[str]) -> bool:
+    # Usable when built with the same model and from the CSV that is on disk now (if any)
+    manifest = artifact.read_manifest(path)
+    if manifest is None or manifest.get("model") != EMB_MODEL or artifact.pa is None:
+        return False
+    if csv_path is None or not os.path.exists(csv_path):
+        return True
+    stamp, src = _source_stamp(csv_path), manifest.get("source") or {}
+    return (stamp["mtime"], stamp["size"]) == (src.get("mtime"), src.get("size"))
+
+def _load_dataset(path: str = DATA_PATH, previous: Optional[Dataset] = None,
+                  timings: Optional[Dict[str, float]] = None, use_artifact: bool = True) -> Dataset:
+    """Build a new Dataset from the shared generation or compiled artifact if usable, else from the CSV at `path`."""
+    timings = {} if timings is None else timings
+    if use_artifact and SHARED_DATA_DIR:
+        # the publishing loader owns freshness, so only the model has to match
+        gen = artifact.current_generation(SHARED_DATA_DIR)
+        if gen is not None and _artifact_is_current(gen, None):
+            return _attach_artifact(gen, previous, timings, shared=True)
+        print(f"⚠️ Nothing published for {EMB_MODEL} in {SHARED_DATA_DIR}, loading {path} in this worker")
+        data = _load_local(path, previous, timings, use_artifact)
+        if gen is not None:
+            # remembered so the watcher waits for the next generation instead of reloading for this one
+            data.source["rejected_generation"] = os.path.basename(gen)
+        return data
+    return _load_local(path, previous, timings, use_artifact)
+
+def _load_local(path: str, previous: Optional[Dataset], timings: Dict[str, float], use_artifact: bool) -> Dataset:
+    """Dataset from the compiled artifact next to `path` if it is current, else from the CSV itself."""
+    art = _artifact_path(path)
+    if use_artifact and _artifact_is_current(art, path):
+        return _attach_artifact(art, previous, timings)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset not found at {path}.")
+    source = _source_stamp(path)
+
+    # One pass over the CSV in chunks: each chunk is cleaned, its new distinct texts are
+    # embedded and its rows hashed before the next is parsed, so working memory is a
+    # few chunks rather than several copies of the whole file
+    parse_s = encode_s = 0.0
+    chunks, text_codes, hashes = [], [], []
+    emb: Optional[np.ndarray] = None
+    text_ids: Dict[str, int] = {}
+    encoded = reused = 0
+    reader = _iter_csv(path)
+    while True:
+        t0 = time.perf_counter()
+        chunk = next(reader, None)
+        parse_s += time.perf_counter() - t0
+        if chunk is None:
+            break
+
+        # Texts first seen in this chunk get the next ids and their vectors are appended
+        # in that order; many rows share a text, so each distinct one is encoded once
+        t0 = time.perf_counter()
+        codes, uniq = _chunk_texts(chunk)
+        start = len(text_ids)
+        ids = np.fromiter((text_ids.setdefault(t, len(text_ids)) for t in uniq), dtype=np.int32, count=len(uniq))
+        # two keys can spell the same text ("a b" + "c" vs "a" + "b c"): take each new id once
+        new_ids, first = np.unique(ids, return_index=True)
+        new = pd.Index(uniq[first[new_ids >= start]], dtype=object)
+        if len(new):
+            block, n_encoded = _embed_texts(new, previous)
+            if emb is None:
+                emb = np.empty((0, block.shape[1]), dtype=np.float32)
+            # grow in place (realloc, i.e. mremap for large arrays) rather than
+            # concatenating blocks at the end, which would briefly hold two copies
+            n = emb.shape[0]
+            emb.resize((n + len(block), block.shape[1]), refcheck=False)
+            emb[n:] = block
+            encoded += n_encoded
+            reused += len(new) - n_encoded
+        text_codes.append(ids[codes])
+        hashes.append(pd.util.hash_pandas_object(chunk[_REQUIRED_COLUMNS], index=False).to_numpy())
+        chunks.append(chunk)
+        encode_s += time.perf_counter() - t0
+    if emb is None:
+        raise ValueError(f"No rows in {path}")
+    timings["csv_parse_s"] = round(parse_s, 3)
+    timings["encode_s"] = round(encode_s, 3)
+    timings["texts_encoded"] = encoded
+    timings["texts_reused"] = reused
+    timings["csv_chunks"] = len(chunks)
 
-    df = pd.read_csv(DATA_PATH)
+    t0 = time.perf_counter()
+    df = _concat_chunks(chunks)
+    del chunks
+    # filter postings straight from the categorical codes, before the columns become strings
+    filter_arrays = FilterIndex(df).to_arrays()
+    if not COMPACT_MODE:
+        df = _plain_frame(df)
+    timings["frame_build_s"] = round(time.perf_counter() - t0, 3)
+    uniq = pd.Index(list(text_ids), dtype=object)
+    del text_ids
+    return _build_dataset(df, uniq, emb, np.concatenate(text_codes), np.concatenate(hashes),
+                          source, previous, timings, path, filter_arrays=filter_arrays)
 
-    # Required columns per your generator
-    required = {"person_name", "email", "followers", "platform", "category", "country", "hashtags"}
-    missing = required - set(df.columns)
+def _embed_texts(texts: pd.Index, previous: Optional[Dataset]):
+    """float32 vectors for `texts` (saves memory, plenty precise for cosine) and how many the model encoded.
+
+    Texts already in the previous snapshot or the on-disk cache are not re-encoded.
+    """
+    reuse = previous.texts.get_indexer(texts) if previous is not None else np.full(len(texts), -1)
+    fresh = np.nonzero(reuse < 0)[0]
+    n_encoded = 0
+    if fresh.size:
+        new_emb, n_encoded = encode_cached(_get_model(), texts[fresh].tolist(), _get_emb_store(), normalize_embeddings=True)
+        emb = np.empty((len(texts), new_emb.shape[1]), dtype=np.float32)
+        emb[fresh] = new_emb
+    else:
+        emb = np.empty((len(texts), previous.embeddings.shape[1]), dtype=np.float32)
+    kept = np.nonzero(reuse >= 0)[0]
+    if kept.size:
+        emb[kept] = as_float32(previous.embeddings, reuse[kept])
+    return emb, n_encoded
+
+def _attach_artifact(path: str, previous: Optional[Dataset], timings: Dict[str, float],
+                     shared: bool = False) -> Dataset:
+    # Embeddings, row hashes and filter posting lists stay memory-mapped: processes
+    # attaching the same files share one copy through the page cache
+    t0 = time.perf_counter()
+    a = artifact.read(path)
+    timings["artifact_load_s"] = round(time.perf_counter() - t0, 3)
+    source = dict(a["manifest"]["source"])
+    if shared:
+        source["generation"] = os.path.basename(path)
+    return _build_dataset(a["df"], a["texts"], a["embeddings"], a["emb_index"], a["row_hashes"], source,
+                          previous, timings, path, filter_arrays=a["filters"], shared=shared)
+
+# Explicit parser dtypes: low-cardinality columns come out of the parser as categoricals
+# (one copy of each distinct string per chunk). followers keeps the parser's numeric
+# inference, its fast path for clean files; anything else is coerced per chunk
+_CSV_DTYPES = {"person_name": "str", "email": "str",
+               "platform": "category", "category": "category", "country": "category", "hashtags": "category"}
+
+def _iter_csv(path: str, chunk_rows: Optional[int] = None):
+    """Yield validated, cleaned chunks of the CSV with a derived continent column (CSV_CHUNK_ROWS rows by default)."""
+    chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+    missing = set(_REQUIRED_COLUMNS) - set(pd.read_csv(path, nrows=0).columns)
     if missing:
         raise ValueError(f"CSV missing columns: {missing}")
+    start = 0
+    for chunk in pd.read_csv(path, usecols=_REQUIRED_COLUMNS, dtype=_CSV_DTYPES, chunksize=max(1, chunk_rows)):
+        yield _clean_chunk(chunk, start)
+        start += len(chunk)
 
-    # Clean/standardize dtypes
-    df["person_name"] = df["person_name"].fillna("").astype(str)
-    df["email"] = df["email"].fillna("").astype(str)
-    df["platform"] = df["platform"].fillna("").astype(str)
-    df["category"] = df["category"].fillna("").astype(str)
-    df["country"] = df["country"].fillna("").astype(str)
-    df["hashtags"] = df["hashtags"].fillna("").astype(str)
+def _clean_chunk(df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+    missing = set(_REQUIRED_COLUMNS) - set(df.columns)
+    if missing:
+        raise ValueError(f"CSV rows {start}-{start + len(df)}: missing columns {missing}")
+    for col in ["person_name", "email"]:
+        df[col] = df[col].fillna("")
+    for col in ["platform", "category", "country", "hashtags"]:
+        if df[col].hasnans:
+            if "" not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([""])
+            df[col] = df[col].fillna("")
 
     # followers may come as float/string; coerce to int
-    df["followers"] = pd.to_numeric(df["followers"], errors="coerce").fillna(0).astype(int)
+    followers = pd.to_numeric(df["followers"], errors="coerce")
+    bad = int((followers.isna() & df["followers"].notna()).sum())
+    if bad:
+        print(f"⚠️ CSV rows {start}-{start + len(df)}: {bad} non-numeric followers values set to 0")
+    df["followers"] = followers.fillna(0).astype(np.int64)
 
-    # derive continent
-    df["continent"] = df["country"].apply(_country_to_continent)
+    df["continent"] = _continents(df["country"])
+    return df
 
-    # Build texts for embedding
-    texts = _build_texts(df)
+def _continents(country: pd.Series) -> pd.Categorical:
+    # look up each distinct country once, then map the codes
+    keys = country.cat.categories.str.strip().str.lower()
+    names, inverse = np.unique(keys.map(_CONTINENT_MAP).fillna("Other").to_numpy(dtype=object),
+                               return_inverse=True)
+    return pd.Categorical.from_codes(inverse[country.cat.codes.to_numpy()], categories=names)
 
-    # Encode to float32 (saves memory, plenty precise for cosine)
-    emb = _model.encode(texts, normalize_embeddings=True)
-    emb = np.asarray(emb, dtype=np.float32)
+def _chunk_texts(df: pd.DataFrame):
+    """`_build_texts` for a cleaned chunk, deduplicated on the categorical codes: (row codes, distinct texts)."""
+    cat, tags, plat = (df[c].cat for c in ("category", "hashtags", "platform"))
+    # keys stay below rows**2, so they fit in int64 for any sane chunk size
+    pair, pairs = pd.factorize(cat.codes.to_numpy(np.int64) * len(plat.categories) + plat.codes.to_numpy())
+    codes, keys = pd.factorize(pair.astype(np.int64) * len(tags.categories) + tags.codes.to_numpy())
+    pair_k, tag_k = np.divmod(keys, len(tags.categories))
+    cat_k, plat_k = np.divmod(pairs[pair_k], len(plat.categories))
+    texts = (np.asarray(cat.categories, dtype=object)[cat_k] + " " + np.asarray(tags.categories, dtype=object)[tag_k]
+             + " " + np.asarray(plat.categories, dtype=object)[plat_k])
+    return codes, texts
 
-    _df = df.reset_index(drop=True)
-    _embeddings = emb
-    print(f"✅ Loaded {len(df)} rows from {DATA_PATH}")
+def _concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """One frame from cleaned chunks; categoricals are unioned by code, not re-parsed."""
+    cat_cols = [c for c in chunks[0].columns if isinstance(chunks[0][c].dtype, pd.CategoricalDtype)]
+    df = pd.concat([c.drop(columns=cat_cols) for c in chunks], ignore_index=True)
+    for col in cat_cols:
+        df[col] = union_categoricals([c[col] for c in chunks], sort_categories=True)
+    return df[list(chunks[0].columns)]
 
-_load_dataset()
+_STR_DTYPE = pd.Series([""]).astype(str).dtype
 
-def _gemini_client():
-    if not GEMINI_API_KEY or genai is None:
-        return None
+def _plain_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Categorical columns back to plain strings (what COMPACT_MODE=0 serves from)."""
+    for col in df.columns:
+        values = df[col]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        if pa is not None and getattr(_STR_DTYPE, "storage", None) == "pyarrow":
+            # dictionary decode in Arrow: no Python string per row
+            decoded = pa.DictionaryArray.from_arrays(
+                values.cat.codes.to_numpy(), pa.array(values.cat.categories.to_numpy(dtype=object), type=pa.large_string())
+            ).dictionary_decode()
+            df[col] = pd.Series(pd.array(decoded, dtype=_STR_DTYPE), index=df.index)
+        else:
+            df[col] = values.astype(str)
+    return df
+
+def _read_csv(path: str) -> pd.DataFrame:
+    return _plain_frame(_concat_chunks(list(_iter_csv(path))))
+
+_CATEGORICAL_COLUMNS = ["platform", "category", "country", "continent", "hashtags"]
+
+def _compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Low-cardinality columns become categoricals (each distinct string, hashtag lists
+    # included, is stored once); unique-per-row strings move to Arrow-backed storage
+    df = df.copy(deep=False)
+    for col in _CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
     try:
-        return genai.Client(api_key=GEMINI_API_KEY)
-    except Exception:
+        string_dtype = pd.StringDtype("pyarrow")
+        for col in ["person_name", "email"]:
+            df[col] = df[col].astype(string_dtype)
+    except ImportError:
+        pass
+    df["followers"] = pd.to_numeric(df["followers"], downcast="integer")
+    return df
+
+def _build_dataset(df: pd.DataFrame, uniq: pd.Index, emb: np.ndarray, emb_index: np.ndarray,
+                   row_hashes: np.ndarray, source: Dict[str, Any], previous: Optional[Dataset],
+                   timings: Dict[str, float], origin: str, filter_arrays: Optional[Dict[str, Any]] = None,
+                   shared: bool = False) -> Dataset:
+    t0 = time.perf_counter()
+    if COMPACT_MODE:
+        df = _compact_frame(df)
+    if not shared:
+        # quantizing would give every worker a private copy of the shared matrix
+        emb = quantize(emb, EMB_QUANT)
+    filters = FilterIndex.from_arrays(len(df), filter_arrays) if filter_arrays else FilterIndex(df)
+    ivf_opts = {"nlist": IVF_NLIST, "nprobe": IVF_NPROBE} if RETRIEVAL_MODE.lower() == "ivf" else {}
+    retriever = build_retriever(RETRIEVAL_MODE, emb, emb_index, **ivf_opts)
+    timings["index_build_s"] = round(time.perf_counter() - t0, 3)
+
+    if shared:
+        # workers reload independently: the generation is the version they agree on
+        version = artifact.generation_number(origin)
+    else:
+        version = previous.version + 1 if previous is not None else 1
+    print(f"✅ Loaded {len(df)} rows ({len(uniq)} distinct texts) from {origin} as version {version}")
+    # deep memory_usage walks every string cell: once per snapshot, never per /health probe
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    return Dataset(version, df, uniq, emb, emb_index, filters, retriever, row_hashes, source, frame_bytes)
+
+def _current() -> Dataset:
+    # Read the snapshot reference once per request; a concurrent reload swaps it atomically
+    data = _data
+    if data is None:
+        raise HTTPException(503, "Service is warming up, retry shortly.", headers={"Retry-After": "5"})
+    return data
+
+def _reload_dataset(path: str = DATA_PATH) -> Dict[str, Any]:
+    """Load `path` next to the live snapshot, then swap it in. Live requests keep the old one."""
+    global _data, _last_reload
+    with _reload_lock:
+        previous = _data
+        timings: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        data = _load_dataset(path, previous, timings)
+
+        added = removed = None
+        if previous is not None:
+            added = int(np.count_nonzero(~np.isin(data.row_hashes, previous.row_hashes)))
+            removed = int(np.count_nonzero(~np.isin(previous.row_hashes, data.row_hashes)))
+        _data = data
+        _last_reload = {
+            "version": data.version,
+            "previous_version": previous.version if previous is not None else None,
+            "rows": int(data.df.shape[0]),
+            "rows_added_or_changed": added,
+            "rows_removed_or_changed": removed,
+            "reload_s": round(time.perf_counter() - t0, 3),
+            **timings,
+        }
+        return _last_reload
+
+def _source_changed(data: Dataset) -> bool:
+    if SHARED_DATA_DIR:
+        # a loader published a new generation
+        gen = artifact.current_generation(SHARED_DATA_DIR)
+        return gen is not None and os.path.basename(gen) not in (
+            data.source.get("generation"), data.source.get("rejected_generation"))
+    try:
+        stamp = _source_stamp(DATA_PATH)
+    except OSError:
+        return False
+    return (stamp["mtime"], stamp["size"]) != (data.source["mtime"], data.source["size"])
+
+def _watch_dataset(interval: float):
+    # Poll DATA_PATH (or the shared CURRENT pointer) and hot-reload when it changes
+    watched = SHARED_DATA_DIR or DATA_PATH
+    while True:
+        time.sleep(interval)
+        data = _data
+        if data is None or not _source_changed(data):
+            continue
+        try:
+            print(f"🔄 {watched} changed, reloading: {_reload_dataset()}")
+        except Exception as e:
+            print(f"❌ Reload of {watched} failed, keeping version {data.version}: {e}")
+
+_gemini = None
+_gemini_lock = threading.Lock()
+
+def _gemini_client():
+    # One client for the whole process; it keeps its HTTP connections alive between calls.
+    # Optional Gemini (for outreach), imported on first use. Safe to omit if no key.
+    global _gemini
+    if not GEMINI_API_KEY:
         return None
+    if _gemini is None:
+        with _gemini_lock:
+            if _gemini is None:
+                try:
+                    from google import genai  # google-genai >= 0.5.x
+                    _gemini = genai.Client(api_key=GEMINI_API_KEY)
+                except Exception:
+                    return None
+    return _gemini
+
+_outreach_pool = ThreadPoolExecutor(max_workers=max(1, OUTREACH_WORKERS), thread_name_prefix="outreach")
+# Ranking runs here, never in Starlette's shared threadpool; outreach has its own slots,
+# so slow LLM calls cannot hold up ranking
+_cpu_pool = ThreadPoolExecutor(max_workers=max(1, CPU_WORKERS), thread_name_prefix="cpu")
+_match_admission = AdmissionControl(MATCH_MAX_INFLIGHT, MATCH_MAX_QUEUE, MATCH_QUEUE_TIMEOUT)
+_llm_slots = AdmissionControl(OUTREACH_WORKERS, 4 * OUTREACH_WORKERS, OUTREACH_TIMEOUT)
 
 # ---- Utility endpoints ----
 @app.get("/health")
 def health():
+    # Liveness: always answers, even while the model and dataset are still loading
+    data = _data
     return {
         "status": "ok",
-        "rows": int(_df.shape[0]) if _df is not None else 0,
+        "ready": _ready.is_set(),
+        "rows": int(data.df.shape[0]) if data is not None else 0,
         "dataset": DATA_PATH,
-        "embeddings_shape": None if _embeddings is None else list(_embeddings.shape),
+        "dataset_version": data.version if data is not None else None,
+        "shared_generation": data.source.get("generation") if data is not None else None,
+        "last_reload": _last_reload,
+        "embeddings_shape": None if data is None else list(data.embeddings.shape),
+        "distinct_texts": None if data is None else int(data.embeddings.shape[0]),
+        "memory_bytes": None if data is None else {
+            "frame": data.frame_bytes,
+            "embeddings": int(data.embeddings.nbytes),
+        },
         "model": EMB_MODEL,
+        "embedding_cache": _emb_store.stats() if _emb_store is not None else None,
+        "query_cache": _query_cache.stats(),
+        "result_cache": {"ranking": _rank_cache.stats(), "outreach": _outreach_cache.stats(),
+                         "single_flight": _single_flight.stats()},
+        "query_batching": _query_batcher.stats() if QUERY_BATCH_WINDOW_MS > 0 else None,
+        "admission": {"match": _match_admission.stats(), "llm": _llm_slots.stats()},
+        "retrieval": data.retriever.info() if data is not None else None,
+        "smtp": _smtp_pool.stats() if _smtp_pool is not None else None,
+        "email_jobs": _email_jobs.stats(),
+        "startup": _startup,
     }
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition: stage latency histograms, outreach / email / cache counters"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def ready():
+    # Readiness: 200 once the model and dataset are loaded, 503 before (or if warm-up failed)
+    if not _ready.is_set():
+        return JSONResponse(status_code=503, content={"status": _startup["state"], **_startup},
+                            headers={"Retry-After": "5"})
+    return {"status": "ready", **_startup}
+
 @app.get("/meta")
 def meta():
-    platforms = sorted(map(str, _df["platform"].dropna().unique().tolist()))
-    categories = sorted(map(str, _df["category"].dropna().unique().tolist()))
-    continents = sorted(map(str, _df["continent"].dropna().unique().tolist()))
+    _require_ready()
+    data = _current()
+    platforms = data.filters.values("platform")
+    categories = data.filters.values("category")
+    continents = data.filters.values("continent")
     return {
         "platforms": platforms,
         "categories": categories,
         "continents": continents,
-        "follower_min": int(_df["followers"].min()),
-        "follower_max": int(_df["followers"].max()),
+        "follower_min": int(data.df["followers"].min()),
+        "follower_max": int(data.df["followers"].max()),
+        "dataset_version": data.version,
     }
 
+@app.post("/reload")
+def reload_dataset():
+    """Re-read DATA_PATH (or attach the current shared generation), embed only new texts and atomically swap the live dataset"""
+    _require_ready()
+    try:
+        return _reload_dataset()
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(400, f"Reload failed, still serving version {_current().version}: {e}")
+
 # ---- Scoring (similarity + follower fit) ----
-def _compute_scores(brief, continent, platform, category, max_followers, top_k):
-    df = _df
-    mask = np.ones(df.shape[0], dtype=bool)
-    if continent:
-        mask &= (df["continent"].values == continent)
-    if platform:
-        mask &= (df["platform"].values == platform)
-    if category:
-        mask &= (df["category"].values == category)
-
-    idxs = np.nonzero(mask)[0]
+def _normalize_brief(brief: str) -> str:
+    return " ".join(brief.split())
+
+def _encode_briefs(briefs: List[str]) -> List[np.ndarray]:
+    # One model call for the whole batch; identical briefs are encoded once
+    uniq = list(dict.fromkeys(briefs))
+    vecs = np.asarray(_get_model().encode(uniq, normalize_embeddings=True), dtype=np.float32)
+    vecs.setflags(write=False)
+    by_brief = dict(zip(uniq, vecs))
+    return [by_brief[b] for b in briefs]
+
+def _encode_queries(briefs: List[str]) -> np.ndarray:
+    """(B, D) query matrix: cached briefs are reused, the rest are encoded in one model call."""
+    keys = [_normalize_brief(b) for b in briefs]
+    vecs = [_query_cache.get(k) for k in keys]
+    missing = [k for k, v in zip(keys, vecs) if v is None]
+    if missing:
+        fresh = dict(zip(missing, _encode_briefs(missing)))
+        for key, vec in fresh.items():
+            _query_cache.set(key, vec)
+        vecs = [fresh[k] if v is None else v for k, v in zip(keys, vecs)]
+    return np.stack(vecs)
+
+_query_batcher = MicroBatcher(_encode_briefs, QUERY_BATCH_WINDOW_MS / 1000.0, QUERY_BATCH_MAX, name="query-encode")
+
+def _encode_query(brief: str) -> np.ndarray:
+    # Users re-run the same brief while tweaking filters; skip the model on repeats
+    key = _normalize_brief(brief)
+    q_emb = _query_cache.get(key)
+    if q_emb is None:
+        if QUERY_BATCH_WINDOW_MS > 0:
+            q_emb = _query_batcher.submit(key)
+        else:
+            q_emb = _encode_briefs([key])[0]
+        _query_cache.set(key, q_emb)
+    return q_emb
+
+def _compute_scores(brief, continent, platform, category, max_followers, top_k, data: Optional[Dataset] = None):
+    data = data or _current()
+    with _stage("filter"):
+        sel = data.filters.select(continent=continent, platform=platform, category=category)
+        empty = sel is not None and sel.rows().size == 0
+    if empty:
+        return []
+
+    # semantic similarity (cosine-like since normalized) for the rows the retriever keeps
+    with _stage("encode"):
+        q_emb = _encode_query(brief)
+    k = int(max(1, top_k or 5))
+    with _stage("retrieve"):
+        idxs, sim = data.retriever.candidates(q_emb, sel, k)
     if len(idxs) == 0:
         return []
 
-    # semantic similarity
-    q_emb = _model.encode([brief], normalize_embeddings=True)[0].astype(np.float32)
-    sim = np.dot(_embeddings[idxs], q_emb)  # cosine-like since normalized
+    return _score_candidates(data, idxs, sim, q_emb, _follower_fit(data, idxs, max_followers), k)
+
+def _compute_scores_batch(briefs: List[str], continent, platform, category, max_followers, top_k,
+                          data: Optional[Dataset] = None) -> List[List[Dict[str, Any]]]:
+    """`_compute_scores` for many briefs: one encode call and, for exact retrieval, one matrix product."""
+    data = data or _current()
+    with _stage("filter"):
+        sel = data.filters.select(continent=continent, platform=platform, category=category)
+        empty = sel is not None and sel.rows().size == 0
+    if empty:
+        return [[] for _ in briefs]
+
+    with _stage("encode"):
+        Q = _encode_queries(briefs)
+    k = int(max(1, top_k or 5))
+    retriever = data.retriever
+    if not hasattr(retriever, "candidates_many"):
+        # IVF probes different cells for every query, so candidates are per brief
+        out = []
+        for q in Q:
+            with _stage("retrieve"):
+                idxs, sim = retriever.candidates(q, sel, k)
+            out.append(_score_candidates(data, idxs, sim, q, _follower_fit(data, idxs, max_followers), k)
+                       if len(idxs) else [])
+        return out
+
+    # bound the (distinct texts x briefs) similarity matrix to ~8M floats per product
+    step = max(1, 8_000_000 // max(1, data.embeddings.shape[0]))
+    out = []
+    for start in range(0, Q.shape[0], step):
+        block = Q[start:start + step]
+        with _stage("retrieve"):
+            rows, pos, sims = retriever.candidates_many(block, sel)
+        foll_score = _follower_fit(data, rows, max_followers)  # the same rows for every brief
+        sims = np.ascontiguousarray(sims.T)
+        for q, text_sims in zip(block, sims):
+            out.append(_score_candidates(data, rows, text_sims[pos], q, foll_score, k) if rows.size else [])
+    return out
 
+def _follower_fit(data: Dataset, idxs: np.ndarray, max_followers) -> np.ndarray:
     # follower fit: prefer <= max_followers
-    foll = df.loc[idxs, "followers"].astype(float).to_numpy()
+    foll = data.df["followers"].to_numpy()[idxs].astype(float)
     if max_followers and max_followers > 0:
         with np.errstate(divide="ignore", invalid="ignore"):
             ratio = np.divide(max_followers, foll, out=np.full_like(foll, 1.0, dtype=float), where=foll > 0)
-        foll_score = np.where(foll <= max_followers, 1.0, np.clip(ratio, 0.1, 1.0))
-    else:
-        foll_score = np.ones_like(foll, dtype=float)
+        return np.where(foll <= max_followers, 1.0, np.clip(ratio, 0.1, 1.0))
+    return np.ones_like(foll, dtype=float)
+
+def _score_candidates(data: Dataset, idxs: np.ndarray, sim: np.ndarray, q_emb: np.ndarray,
+                      foll_score: np.ndarray, k: int) -> List[Dict[str, Any]]:
+    with _stage("score"):
+        idxs, score, sim, foll_score = _select_top(data, idxs, sim, q_emb, foll_score, k)
+    with _stage("records"):
+        return _match_records(data.df, idxs, score, sim, foll_score)
 
+def _select_top(data: Dataset, idxs: np.ndarray, sim: np.ndarray, q_emb: np.ndarray, foll_score: np.ndarray, k: int):
     # final score: emphasize semantic match
     score = 0.75 * sim + 0.25 * foll_score
 
-    k = int(min(max(1, top_k or 5), score.size))
-    top_local = np.argsort(-score)[:k]
-    sel = idxs[top_local]
+    # shortlist the k best (with slack for BLAS rounding), then re-score the shortlist with
+    # exact_similarity so single and batched queries rank identically; rows share texts, so
+    # each distinct text is scored once and fanned out
+    k = min(k, score.size)
+    cutoff = np.partition(score, score.size - k)[score.size - k] - 1e-4
+    short = np.nonzero(score >= cutoff)[0]
+    text_ids, inverse = np.unique(data.emb_index[idxs[short]], return_inverse=True)
+    sim = exact_similarity(data.embeddings, text_ids, q_emb)[inverse]
+    foll_score = foll_score[short]
+    idxs = idxs[short]
+    score = 0.75 * sim + 0.25 * foll_score
 
-    top = df.loc[sel].copy()
-    top["FitScore"] = (score[top_local] * 100).round(2)
-    top["_relevance"] = (sim[top_local] * 100).round(2)
-    top["_follower_fit"] = (foll_score[top_local] * 100).round(2)
-    return top
+    # partial selection of the k best, then sort only those (ties broken by row order)
+    top_local = np.argpartition(-score, k - 1)[:k] if k < score.size else np.arange(score.size)
+    top_local = top_local[np.lexsort((idxs[top_local], -score[top_local]))]
+    return idxs[top_local], score[top_local], sim[top_local], foll_score[top_local]
 
-def _outreach(brief: str, row: Dict[str, Any], user_name: str = None, company_name: str = None) -> str:
-    client = _gemini_client()
-    
-    # Use provided names or defaults
-    sender_name = user_name if user_name else "[Your Name]"
-    sender_company = company_name if company_name else "[Your Company]"
-    
-    if client:
-        prompt = f"""
+_RESULT_COLUMNS = ["person_name", "email", "platform", "followers", "country", "continent", "category", "hashtags"]
+
+def _match_records(df: pd.DataFrame, sel: np.ndarray, score, sim, foll_score) -> List[Dict[str, Any]]:
+    # Build response rows from column arrays rather than per-row pandas objects
+    cols = {c: df[c].take(sel).tolist() for c in _RESULT_COLUMNS}
+    cols["followers"] = [int(f) for f in cols["followers"]]
+    fit = np.round(score * 100, 2).tolist()
+    rel = np.round(np.asarray(sim, dtype=float) * 100, 2).tolist()
+    ffit = np.round(foll_score * 100, 2).tolist()
+    return [
+        {
+            **{c: cols[c][i] for c in _RESULT_COLUMNS},
+            "fit_score": fit[i],
+            "subscores": {"relevance": rel[i], "follower_fit": ffit[i]},
+        }
+        for i in range(len(sel))
+    ]
+
+def _outreach_prompt(brief: str, row: Dict[str, Any], sender_name: str, sender_company: str) -> str:
+    return f"""
 Write a short promotional outreach email (<120 words), warm and professional.
 Use the brand brief, mention platform & category, and end with a clear CTA.
 The email should be from {sender_name} representing {sender_company}.
@@ -231,23 +909,8 @@ Country: {row['country']} (Continent: {row.get('continent','')})
 Category: {row['category']}
 Hashtags: {row['hashtags']}
 """
-        try:
-            # Try modern style
-            resp = None
-            if hasattr(client, "responses"):
-                resp = client.responses.generate(model=GEMINI_MODEL, input=prompt)
-                text = getattr(resp, "output_text", None)
-                if text:
-                    return text.strip()
-            # Try legacy style
-            if hasattr(client, "models"):
-                resp = client.models.generate_content(model=GEMINI_MODEL, contents=prompt)
-                text = getattr(resp, "text", None)
-                if text:
-                    return text.strip()
-        except Exception:
-            pass
-    # Fallback
+
+def _fallback_outreach(row: Dict[str, Any], sender_name: str, sender_company: str) -> str:
     return (
         f"Hi {row['person_name']},\n\n"
         f"I'm {sender_name} from {sender_company}. We love your {row['category']} content on {row['platform']} "
@@ -256,132 +919,348 @@ Hashtags: {row['hashtags']}
         f"Best regards,\n{sender_name}\n{sender_company}"
     )
 
+def _outreach_llm(client, prompt: str) -> Optional[str]:
+    # blocking Gemini call for the outreach threads; the caller counts the result
+    with _stage("outreach_llm"):
+        return _generate(client, prompt)
+
+def _generate(client, prompt: str) -> Optional[str]:
+    try:
+        # Try modern style
+        resp = None
+        if hasattr(client, "responses"):
+            resp = client.responses.generate(model=GEMINI_MODEL, input=prompt)
+            text = getattr(resp, "output_text", None)
+            if text:
+                return text.strip()
+        # Try legacy style
+        if hasattr(client, "models"):
+            resp = client.models.generate_content(model=GEMINI_MODEL, contents=prompt)
+            text = getattr(resp, "text", None)
+            if text:
+                return text.strip()
+    except Exception:
+        pass
+    return None
+
+async def _outreach_async(brief: str, row: Dict[str, Any], user_name: str = None, company_name: str = None) -> str:
+    """Non-blocking `_outreach`: the async Gemini client when available, bounded by OUTREACH_TIMEOUT."""
+    client = _gemini_client()
+    sender_name = user_name if user_name else "[Your Name]"
+    sender_company = company_name if company_name else "[Your Company]"
+    if not client:
+        _outreach_total.inc(result="template")
+        return _fallback_outreach(row, sender_name, sender_company)
+
+    aio = getattr(client, "aio", None)
+    try:
+        prompt = _outreach_prompt(brief, row, sender_name, sender_company)
+        if aio is not None and hasattr(aio, "models"):
+            async with _llm_slots.slot():
+                call = aio.models.generate_content(model=GEMINI_MODEL, contents=prompt)
+                with _stage("outreach_llm"):
+                    resp = await asyncio.wait_for(call, OUTREACH_TIMEOUT)
+            text = (getattr(resp, "text", None) or "").strip()
+        else:
+            # no async client: run the blocking call on the outreach threads. A call we stop
+            # waiting for keeps its thread busy, so it keeps its LLM slot until it returns
+            await _llm_slots.acquire()
+            call = asyncio.get_running_loop().run_in_executor(_outreach_pool, _outreach_llm, client, prompt)
+            call.add_done_callback(_release_on_done(_llm_slots))
+            text = await asyncio.wait_for(asyncio.shield(call), OUTREACH_TIMEOUT)
+        if text:
+            # every message is counted once, here
+            _outreach_total.inc(result="generated")
+            return text
+    except Exception:
+        # LLM slots exhausted, timed out or API error
+        pass
+    _outreach_total.inc(result="fallback")
+    return _fallback_outreach(row, sender_name, sender_company)
+
+async def _outreach_many_async(brief: str, rows: List[Dict[str, Any]], user_name: str = None,
+                               company_name: str = None, sem: Optional[asyncio.Semaphore] = None,
+                               on_message=None) -> List[str]:
+    """Outreach for every row, in row order; at most OUTREACH_CONCURRENCY calls in flight per request
+    unless the caller passes its own request-level `sem`. `on_message(i, message)` sees each as it completes."""
+    sem = sem or asyncio.Semaphore(max(1, OUTREACH_CONCURRENCY))
+
+    async def one(i, row):
+        async with sem:
+            message = await _outreach_async(brief, row, user_name, company_name)
+        if on_message is not None:
+            on_message(i, message)
+        return message
+
+    return list(await asyncio.gather(*(one(i, r) for i, r in enumerate(rows))))
+
+async def _rank(fn, *args):
+    # Admission + CPU stage: 503 when saturated, 504 when ranking overruns RANK_TIMEOUT
+    loop = asyncio.get_running_loop()
+    prof = profiling.current()
+    if prof is not None:
+        # executor threads do not inherit context vars: carry the profile over explicitly
+        fn, args = contextvars.copy_context().run, (prof.run, fn) + args
+    try:
+        await _match_admission.acquire()
+    except Overloaded:
+        raise HTTPException(503, "Too many concurrent match requests, retry shortly.", headers={"Retry-After": "1"})
+    fut = loop.run_in_executor(_cpu_pool, fn, *args)
+    # The slot is held until the ranking really finishes: a request that gave up at
+    # RANK_TIMEOUT leaves its thread busy, so it keeps counting against MATCH_MAX_INFLIGHT
+    fut.add_done_callback(_release_on_done(_match_admission))
+    try:
+        return await asyncio.wait_for(asyncio.shield(fut), RANK_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(504, "Ranking timed out.")
+
+def _release_on_done(admission: AdmissionControl):
+    """Done callback for an executor future: frees its `admission` slot when the thread finishes."""
+    def release(fut: asyncio.Future):
+        if not fut.cancelled():
+            fut.exception()  # retrieved here, so an abandoned call's error is not logged as unhandled
+        admission.release()
+    return release
+
+def _match_key(req: MatchRequest, data: Dataset) -> tuple:
+    # Requests that rank identically share a key: whitespace-normalized brief, empty filters as None
+    max_followers = req.max_followers if req.max_followers and req.max_followers > 0 else 0
+    return ("rank", data.version, _normalize_brief(req.brief), req.continent or None, req.platform or None,
+            req.category or None, max_followers, int(max(1, req.top_k or 5)))
+
+def _outreach_key(key: tuple, req: MatchRequest) -> tuple:
+    return key + ("outreach", req.user_name or "", req.company_name or "")
+
+async def _cached(cache: TTLCache, key: tuple, compute, cacheable=None):
+    """Cache hit, else join an identical in-flight computation, else compute and store."""
+    if profiling.current() is not None:
+        # a profiled request runs every stage itself
+        return await compute()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    def store(result):
+        if cacheable is None or cacheable(result):
+            cache.set(key, result)
+
+    return await _single_flight.do(key, compute, store)
+
+def _all_generated(rows: List[Dict[str, Any]], req: MatchRequest):
+    # Template fallbacks (LLM timed out / overloaded) are not cached when an LLM is configured
+    if _gemini_client() is None:
+        return lambda messages: True
+    sender = (req.user_name or "[Your Name]", req.company_name or "[Your Company]")
+    return lambda messages: all(m != _fallback_outreach(r, *sender) for r, m in zip(rows, messages))
+
+def _profile_mode(request: Request) -> Optional[str]:
+    """None unless profiling was asked for; 403 unless the caller presents ADMIN_TOKEN."""
+    flag = (request.headers.get("x-profile") or request.query_params.get("profile") or "").lower()
+    if not flag or flag in ("0", "false", "no"):
+        return None
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(403, "Profiling is restricted to admins.")
+    return "cprofile" if flag == "cprofile" else "stages"
+
 @app.post("/match")
-def match(req: MatchRequest):
+async def match(req: MatchRequest, request: Request):
+    mode = _profile_mode(request)
+    if mode is None:
+        return await _match(req)
+    with profiling.activate(profiling.RequestProfile(cprofile=mode == "cprofile")) as prof:
+        result = await _match(req)
+    return {**result, "profile": prof.report("match", PROFILE_DIR)}
+
+async def _match(req: MatchRequest) -> Dict[str, Any]:
+    _require_ready()
     if not req.brief or not req.brief.strip():
         raise HTTPException(400, "Brief is required.")
 
-    top = _compute_scores(
-        req.brief, req.continent, req.platform, req.category, req.max_followers, req.top_k
-    )
+    data = _current()
+    key = _match_key(req, data)
+    top = await _cached(_rank_cache, key, lambda: _rank(
+        _compute_scores, req.brief, req.continent, req.platform, req.category, req.max_followers, req.top_k, data))
     if len(top) == 0:
-        return {"matches": [], "explanations": "No influencers found for those filters."}
-
-    results = []
-    for _, r in top.iterrows():
-        row_dict = r.to_dict()
-        results.append({
-            "person_name": r["person_name"],
-            "email": r["email"],
-            "platform": r["platform"],
-            "followers": int(r["followers"]),
-            "country": r["country"],
-            "continent": r["continent"],
-            "category": r["category"],
-            "hashtags": r["hashtags"],
-            "fit_score": float(r["FitScore"]),
-            "subscores": {
-                "relevance": float(r["_relevance"]),
-                "follower_fit": float(r["_follower_fit"]),
-            },
-            "outreach_message": _outreach(req.brief, row_dict, req.user_name, req.company_name),
-        })
-    return {"matches": results, "explanations": "Ranked by semantic relevance + follower fit."}
+        return {"matches": [], "explanations": "No influencers found for those filters.",
+                "dataset_version": data.version}
+
+    # cached rows are shared between requests: copy before adding outreach
+    results = [dict(r) for r in top]
+    if req.outreach:
+        with _stage("outreach"):
+            messages = await _cached(_outreach_cache, _outreach_key(key, req), lambda: _outreach_many_async(
+                req.brief, top, req.user_name, req.company_name), _all_generated(top, req))
+        for r, message in zip(results, messages):
+            r["outreach_message"] = message
+    return {"matches": results, "explanations": "Ranked by semantic relevance + follower fit.",
+            "dataset_version": data.version}
+
+@app.post("/match/batch")
+async def match_batch(req: BatchMatchRequest):
+    """Rank many briefs against the same filters in one call; outreach is opt-in."""
+    _require_ready()
+    if not req.briefs or any(not b or not b.strip() for b in req.briefs):
+        raise HTTPException(400, "Every brief must be non-empty.")
+    if len(req.briefs) > MATCH_BATCH_MAX:
+        raise HTTPException(400, f"At most {MATCH_BATCH_MAX} briefs per batch.")
+
+    data = _current()
+    ranked = await _rank(_compute_scores_batch, req.briefs, req.continent, req.platform, req.category,
+                         req.max_followers, req.top_k, data)
+    if req.outreach:
+        # one budget for the whole batch, within the LLM slots, so briefs do not shed each other
+        sem = asyncio.Semaphore(max(1, min(OUTREACH_WORKERS, OUTREACH_CONCURRENCY * len(req.briefs))))
+        all_messages = await asyncio.gather(*(
+            _outreach_many_async(brief, rows, req.user_name, req.company_name, sem)
+            for brief, rows in zip(req.briefs, ranked)
+        ))
+        for rows, messages in zip(ranked, all_messages):
+            for r, message in zip(rows, messages):
+                r["outreach_message"] = message
+    return {
+        "results": [{"brief": brief, "matches": rows} for brief, rows in zip(req.briefs, ranked)],
+        "dataset_version": data.version,
+    }
+
+@app.post("/match/stream")
+async def match_stream(req: MatchRequest):
+    """NDJSON stream: ranked matches first, then one event per outreach message as it completes."""
+    _require_ready()
+    if not req.brief or not req.brief.strip():
+        raise HTTPException(400, "Brief is required.")
+
+    data = _current()
+    # same cache keys as /match, so the UI shares rankings and outreach with API callers
+    key = _match_key(req, data)
+    top = await _cached(_rank_cache, key, lambda: _rank(
+        _compute_scores, req.brief, req.continent, req.platform, req.category, req.max_followers, req.top_k, data))
+
+    async def events():
+        if len(top) == 0:
+            yield _ndjson({"event": "matches", "matches": [], "explanations": "No influencers found for those filters.",
+                           "dataset_version": data.version})
+        else:
+            yield _ndjson({"event": "matches", "matches": top, "explanations": "Ranked by semantic relevance + follower fit.",
+                           "dataset_version": data.version})
+        if req.outreach and top:
+            # messages this request computes arrive through the queue as they complete; None ends it
+            ready: asyncio.Queue = asyncio.Queue()
+            messages = asyncio.ensure_future(_cached(_outreach_cache, _outreach_key(key, req), lambda: _outreach_many_async(
+                req.brief, top, req.user_name, req.company_name, on_message=lambda i, m: ready.put_nowait((i, m))),
+                _all_generated(top, req)))
+            messages.add_done_callback(lambda f: ready.put_nowait(None))
+            sent = set()
+            try:
+                while (item := await ready.get()) is not None:
+                    sent.add(item[0])
+                    yield _ndjson({"event": "outreach", "index": item[0], "outreach_message": item[1]})
+                # cache hit, or joined another request's computation: send what did not stream
+                for i, message in enumerate(await messages):
+                    if i not in sent:
+                        yield _ndjson({"event": "outreach", "index": i, "outreach_message": message})
+            finally:
+                # client disconnected: stop waiting; a shared computation finishes and is cached
+                messages.cancel()
+        yield _ndjson({"event": "done"})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _ndjson(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+_smtp_pool: Optional[SMTPPool] = None
+_smtp_lock = threading.Lock()
+
+def _get_smtp_pool() -> SMTPPool:
+    global _smtp_pool
+    if _smtp_pool is None:
+        with _smtp_lock:
+            if _smtp_pool is None:
+                _smtp_pool = SMTPPool(
+                    SMTP_SERVER, SMTP_PORT, SMTP_EMAIL, SMTP_PASSWORD,
+                    size=SMTP_POOL_SIZE, starttls=SMTP_STARTTLS, rate_limit=SMTP_RATE_LIMIT,
+                    observe=_observe_smtp,
+                )
+    return _smtp_pool
+
+_email_workers = ThreadPoolExecutor(max_workers=max(1, SMTP_POOL_SIZE), thread_name_prefix="smtp")
+
+def _build_email(recipient_email: str, recipient_name: str, subject: str, message: str) -> MIMEMultipart:
+    msg = MIMEMultipart("alternative")
+    msg["From"] = SMTP_EMAIL
+    msg["To"] = recipient_email
+    msg["Subject"] = subject
+
+    # Create HTML and plain text versions
+    text = message
+    html = f"""
+    <html>
+      <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+          <h2 style="color: #2563EB;">Hello {recipient_name}!</h2>
+          <div style="white-space: pre-wrap;">{message}</div>
+          <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
+          <p style="color: #666; font-size: 12px;">
+            This is an automated outreach message from Influmony.
+          </p>
+        </div>
+      </body>
+    </html>
+    """
+
+    # Attach both versions
+    msg.attach(MIMEText(text, "plain"))
+    msg.attach(MIMEText(html, "html"))
+    return msg
 
 def _send_email(recipient_email: str, recipient_name: str, subject: str, message: str) -> bool:
-    """Send email to a single recipient"""
+    """Send email to a single recipient over a pooled SMTP session"""
     if not SMTP_EMAIL or not SMTP_PASSWORD:
         raise HTTPException(500, "Email credentials not configured. Please set SMTP_EMAIL and SMTP_PASSWORD in .env")
-    
+
     try:
-        # Create message
-        msg = MIMEMultipart("alternative")
-        msg["From"] = SMTP_EMAIL
-        msg["To"] = recipient_email
-        msg["Subject"] = subject
-        
-        # Create HTML and plain text versions
-        text = message
-        html = f"""
-        <html>
-          <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-              <h2 style="color: #2563EB;">Hello {recipient_name}!</h2>
-              <div style="white-space: pre-wrap;">{message}</div>
-              <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
-              <p style="color: #666; font-size: 12px;">
-                This is an automated outreach message from Influmony.
-              </p>
-            </div>
-          </body>
-        </html>
-        """
-        
-        # Attach both versions
-        part1 = MIMEText(text, "plain")
-        part2 = MIMEText(html, "html")
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_EMAIL, SMTP_PASSWORD)
-            server.send_message(msg)
-        
+        with _stage("email_build"):
+            msg = _build_email(recipient_email, recipient_name, subject, message)
+        _get_smtp_pool().send(msg)
+        _emails_total.inc(result="sent")
         return True
     except Exception as e:
+        _emails_total.inc(result="failed")
         print(f"Failed to send email to {recipient_email}: {str(e)}")
         raise HTTPException(500, f"Failed to send email: {str(e)}")
 
+_email_jobs = EmailJobQueue(
+    EMAIL_JOBS_DIR, _send_email, _email_workers,
+    workers=EMAIL_JOB_WORKERS, max_attempts=EMAIL_MAX_ATTEMPTS, retention=EMAIL_JOB_RETENTION,
+)
+
 @app.post("/send-emails")
-def send_emails(req: EmailRequest):
-    """Send emails to multiple influencers"""
+def send_emails(req: EmailRequest, request: Request):
+    """Queue emails to multiple influencers; poll GET /send-emails/{job_id} for progress"""
+    mode = _profile_mode(request)
+    if mode is None:
+        return _submit_emails(req)
+    with profiling.activate(profiling.RequestProfile(cprofile=mode == "cprofile")) as prof:
+        status = prof.run(_submit_emails, req, True)
+    return {**status, "profile": prof.report("send-emails", PROFILE_DIR)}
+
+def _submit_emails(req: EmailRequest, profile: bool = False) -> Dict[str, Any]:
     if not req.recipients:
         raise HTTPException(400, "No recipients provided")
     
     if not SMTP_EMAIL or not SMTP_PASSWORD:
         raise HTTPException(500, "Email service not configured. Please set SMTP_EMAIL and SMTP_PASSWORD in environment variables.")
     
-    results = []
-    success_count = 0
-    failed_count = 0
-    
-    for recipient in req.recipients:
-        try:
-            name = recipient.get("name", "")
-            email = recipient.get("email", "")
-            message = recipient.get("message", "")
-            
-            if not email or not message:
-                results.append({
-                    "email": email or "unknown",
-                    "status": "failed",
-                    "error": "Missing email or message"
-                })
-                failed_count += 1
-                continue
-            
-            _send_email(email, name, req.subject, message)
-            results.append({
-                "email": email,
-                "name": name,
-                "status": "sent"
-            })
-            success_count += 1
-            
-        except Exception as e:
-            results.append({
-                "email": recipient.get("email", "unknown"),
-                "status": "failed",
-                "error": str(e)
-            })
-            failed_count += 1
-    
-    return {
-        "total": len(req.recipients),
-        "success": success_count,
-        "failed": failed_count,
-        "results": results
-    }
+    with _stage("job_submit"):
+        return _email_jobs.submit(req.recipients, req.subject, req.campaign_brief, profile=profile)
+
+@app.get("/send-emails/{job_id}")
+def send_emails_status(job_id: str):
+    """Per-recipient progress, retries and throughput of a send job"""
+    status = _email_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(404, "Unknown job id")
+    return status
 
+_startup["timings"]["import_s"] = round(time.perf_counter() - _IMPORT_T0, 3)
@@ -0,0 +1,150 @@
+# metrics.py
+# Minimal in-process metrics with Prometheus text exposition (served at GET /metrics).
+#
+#   REGISTRY.counter(...)    monotonically increasing, optional labels (name it *_total)
+#   REGISTRY.histogram(...)  cumulative buckets + _sum + _count per label set
+#   REGISTRY.collect(...)    callback evaluated at scrape time (cache stats etc.)
+#
+# Kept dependency-free on purpose: observing is a lock, a bisect and two adds.
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# seconds; covers sub-millisecond numpy stages up to slow LLM / SMTP calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, List[float]] = {}  # per label set: bucket counts..., +Inf, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", labels, series[-1]
+            yield self.name + "_count", labels, cumulative
+
+
+class Collected:
+    """Metric whose samples come from a callback at scrape time: fn() -> [(labels, value)]."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+                 type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.fn = fn
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self.fn():
+            if value is not None:
+                yield self.name, labels, value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[object] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets or LATENCY_BUCKETS))
+
+    def collect(self, name: str, help: str, fn, type: str = "gauge") -> Collected:
+        return self.register(Collected(name, help, fn, type))
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            try:
+                samples = list(m.samples())
+            except Exception:
+                continue  # a broken collector must not take down the scrape
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
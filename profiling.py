@@ -0,0 +1,90 @@
+# profiling.py
+# Opt-in per-request profiling (admin only, see `_profile_mode` in main.py).
+#
+# A RequestProfile is bound to the request's context while it runs. The stage
+# timers in main.py add to it when one is active; tasks spawned by the request
+# inherit it, and executor calls carry it over via `RequestProfile.run`. When no
+# profile is active the only cost is one ContextVar lookup per stage.
+import cProfile
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def current() -> Optional["RequestProfile"]:
+    return _active.get()
+
+
+@contextmanager
+def activate(profile: "RequestProfile"):
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+
+
+class RequestProfile:
+    """Per-stage wall time for one request, plus an optional cProfile of its CPU-bound part."""
+
+    def __init__(self, cprofile: bool = False):
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.profiler = cProfile.Profile() if cprofile else None
+        self.profiler_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        # concurrent sub-calls (e.g. outreach messages) add up, so a stage can exceed wall time
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str, histogram=None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            self.add(name, seconds)
+            if histogram is not None:
+                histogram.observe(seconds, stage=name)
+
+    def run(self, fn, *args):
+        """Call fn(*args) under the cProfile profiler, if one was requested (from any thread)."""
+        if self.profiler is None:
+            return fn(*args)
+        try:
+            self.profiler.enable()
+        except ValueError as e:
+            # only one profiler can be active at a time (e.g. two profiled requests at once)
+            self.profiler_error = str(e)
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            self.profiler.disable()
+
+    def report(self, kind: str, profile_dir: str) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "total_ms": round((time.perf_counter() - self.t0) * 1000, 3),
+            "stages_ms": {k: round(v * 1000, 3) for k, v in self.stages.items()},
+            "stage_calls": dict(self.counts),
+        }
+        if self.profiler is not None:
+            if self.profiler_error:
+                out["cprofile_error"] = self.profiler_error
+            else:
+                os.makedirs(profile_dir, exist_ok=True)
+                path = os.path.join(profile_dir, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+                self.profiler.dump_stats(path)
+                out["cprofile"] = path  # inspect with: python -m pstats <path>
+        return out
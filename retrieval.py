@@ -0,0 +1,320 @@
+# retrieval.py
+# Candidate retrieval engines behind `_compute_scores`.
+#
+# Both engines work over the distinct-text embedding matrix (U, D) plus the
+# row -> text index (N,) built in `_load_dataset`, and return the dataset rows
+# that survive the filter selection together with their cosine similarity.
+#   - ExactRetriever: scores every candidate row (brute force, today's behavior)
+#   - IVFRetriever:   inverted-file index over k-means cells; only rows in the
+#                     `nprobe` cells closest to the query are scored
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# ---- Filter indexes (integer-coded columns + per-value posting lists) ----
+class FilterIndex:
+    """Equality filters on low-cardinality columns without per-request string compares."""
+
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str] = ("continent", "platform", "category")):
+        self.n_rows = int(df.shape[0])
+        self.codes: Dict[str, np.ndarray] = {}
+        self.lookup: Dict[str, Dict[str, int]] = {}
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for col in columns:
+            codes, values = pd.factorize(df[col], sort=True)
+            codes = codes.astype(np.int32)
+            self.codes[col] = codes
+            self.lookup[col] = {str(v): i for i, v in enumerate(values)}
+            counts = np.bincount(codes[codes >= 0], minlength=len(values))
+            order = np.argsort(codes, kind="stable").astype(np.int64)
+            order = order[codes[order] >= 0]
+            self._postings[col] = (order, np.concatenate([[0], np.cumsum(counts)]))
+
+    @classmethod
+    def from_arrays(cls, n_rows: int, arrays: Dict[str, Dict[str, object]]) -> "FilterIndex":
+        """Rebuild from `to_arrays()` output (e.g. memory-mapped from a dataset artifact)."""
+        self = cls.__new__(cls)
+        self.n_rows = int(n_rows)
+        self.codes, self.lookup, self._postings = {}, {}, {}
+        for col, a in arrays.items():
+            self.codes[col] = a["codes"]
+            self.lookup[col] = {str(v): i for i, v in enumerate(a["values"])}
+            self._postings[col] = (a["order"], a["offsets"])
+        return self
+
+    def to_arrays(self) -> Dict[str, Dict[str, object]]:
+        return {
+            col: {"codes": self.codes[col], "values": list(self.lookup[col]),
+                  "order": self._postings[col][0], "offsets": self._postings[col][1]}
+            for col in self.codes
+        }
+
+    def values(self, col: str) -> List[str]:
+        return list(self.lookup[col])
+
+    def postings(self, col: str, code: int) -> np.ndarray:
+        order, offsets = self._postings[col]
+        return order[offsets[code]:offsets[code + 1]]
+
+    def select(self, **filters: Optional[str]) -> Optional["Selection"]:
+        """Selection for the non-empty filters, or None when nothing is filtered."""
+        terms = []
+        for col, value in filters.items():
+            if not value:
+                continue
+            code = self.lookup[col].get(value)
+            if code is None:
+                return Selection(self, [], empty=True)
+            terms.append((col, code))
+        return Selection(self, terms) if terms else None
+
+
+class Selection:
+    """Conjunction of column == value terms over a FilterIndex."""
+
+    def __init__(self, index: FilterIndex, terms: List[Tuple[str, int]], empty: bool = False):
+        self.index = index
+        # smallest posting list first: it drives the intersection
+        self.terms = sorted(terms, key=lambda t: index.postings(*t).size)
+        self.empty = empty
+        self._rows: Optional[np.ndarray] = None
+
+    def rows(self) -> np.ndarray:
+        """Sorted row ids matching every term."""
+        if self._rows is None:
+            if self.empty:
+                self._rows = np.empty(0, dtype=np.int64)
+            else:
+                rows = self.index.postings(*self.terms[0])
+                for col, code in self.terms[1:]:
+                    rows = rows[self.index.codes[col][rows] == code]
+                self._rows = rows
+        return self._rows
+
+    def contains(self, rows: np.ndarray) -> np.ndarray:
+        if self.empty:
+            return np.zeros(rows.shape[0], dtype=bool)
+        keep = np.ones(rows.shape[0], dtype=bool)
+        for col, code in self.terms:
+            keep &= self.index.codes[col][rows] == code
+        return keep
+
+
+# ---- Compact embeddings ----
+class QuantizedMatrix:
+    """Row-wise quantized (U, D) embeddings: float16, or int8 with one float32 scale per row.
+
+    Dot products dequantize a bounded chunk of rows at a time into float32 and
+    use BLAS, so scoring cost stays close to the float32 path.
+    """
+
+    CHUNK = 2048
+
+    def __init__(self, vectors: np.ndarray, kind: str = "int8"):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.kind = kind
+        if kind == "float16":
+            self.data = vectors.astype(np.float16)
+            self.scale = None
+        elif kind == "int8":
+            scale = np.abs(vectors).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            self.data = np.round(vectors / scale[:, None]).astype(np.int8)
+            self.scale = scale.astype(np.float32)
+        else:
+            raise ValueError(f"Unknown quantization {kind!r}; expected 'float16' or 'int8'")
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    def dequantize(self, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        data = self.data if ids is None else self.data[ids]
+        out = data.astype(np.float32)
+        if self.scale is not None:
+            out *= (self.scale if ids is None else self.scale[ids])[:, None]
+        return out
+
+    def dot(self, q: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows times q, where q is one query (D,) or a query matrix (D, B)."""
+        n = self.data.shape[0] if ids is None else ids.shape[0]
+        out = np.empty((n,) + q.shape[1:], dtype=np.float32)
+        for start in range(0, n, self.CHUNK):
+            part = slice(start, start + self.CHUNK)
+            rows = self.data[part] if ids is None else self.data[ids[part]]
+            out[part] = np.dot(rows.astype(np.float32), q)
+        if self.scale is not None:
+            scale = self.scale if ids is None else self.scale[ids]
+            out *= scale.reshape((-1,) + (1,) * (q.ndim - 1))
+        return out
+
+
+def quantize(vectors: np.ndarray, kind: Optional[str]):
+    kind = (kind or "none").lower()
+    return vectors if kind in ("none", "float32", "") else QuantizedMatrix(vectors, kind)
+
+
+def as_float32(vectors, ids: Optional[np.ndarray] = None) -> np.ndarray:
+    if isinstance(vectors, QuantizedMatrix):
+        return vectors.dequantize(ids)
+    return np.asarray(vectors if ids is None else vectors[ids], dtype=np.float32)
+
+
+def _dot(vectors, q: np.ndarray, ids: Optional[np.ndarray] = None) -> np.ndarray:
+    if isinstance(vectors, QuantizedMatrix):
+        return vectors.dot(q, ids)
+    return np.dot(vectors if ids is None else vectors[ids], q)
+
+
+def exact_similarity(vectors, ids: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Cosine similarity of rows `ids` and q, accumulated row by row in float64 (pass distinct ids).
+
+    BLAS results depend on how many rows and queries go into one call (gemv vs
+    gemm, blocking), so final rankings are recomputed with this instead.
+    """
+    return (as_float32(vectors, ids).astype(np.float64) * q.astype(np.float64)).sum(axis=1)
+
+
+def _similarity(vectors, text_ids: np.ndarray, rows: np.ndarray, q: np.ndarray) -> np.ndarray:
+    # score each distinct text once and fan out when that is cheaper
+    if vectors.shape[0] <= rows.size:
+        return _dot(vectors, q)[text_ids[rows]]
+    return _dot(vectors, q, text_ids[rows])
+
+
+class ExactRetriever:
+    name = "exact"
+
+    def __init__(self, vectors: np.ndarray, text_ids: np.ndarray):
+        self.vectors = vectors
+        self.text_ids = text_ids
+
+    def candidates(self, q: np.ndarray, sel: Optional[Selection], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.arange(self.text_ids.shape[0]) if sel is None else sel.rows()
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        return rows, _similarity(self.vectors, self.text_ids, rows, q)
+
+    def candidates_many(self, Q: np.ndarray, sel: Optional[Selection]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """`candidates` for a query matrix Q (B, D) with one matrix product.
+
+        Returns (rows, pos, sims) where sims is (T, B) over distinct texts and
+        the similarity of rows[i] to query j is sims[pos[i], j].
+        """
+        rows = np.arange(self.text_ids.shape[0]) if sel is None else sel.rows()
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.int64), np.empty((0, Q.shape[0]), dtype=np.float32)
+        tids = self.text_ids[rows]
+        if self.vectors.shape[0] <= rows.size:
+            return rows, tids, _dot(self.vectors, Q.T)
+        uniq, pos = np.unique(tids, return_inverse=True)
+        return rows, pos, _dot(self.vectors, Q.T, uniq)
+
+    def info(self) -> Dict[str, object]:
+        return {"mode": self.name}
+
+
+def spherical_kmeans(x: np.ndarray, k: int, iters: int = 10, sample: int = 100_000,
+                     seed: int = 0, batch: int = 65_536) -> Tuple[np.ndarray, np.ndarray]:
+    """Cosine k-means on L2-normalized rows. Returns (centroids (k, D), assignment (n,))."""
+    rng = np.random.default_rng(seed)
+    n = x.shape[0]
+    k = max(1, min(k, n))
+    train = x if n <= sample else x[np.sort(rng.choice(n, sample, replace=False))]
+    centroids = np.array(train[rng.choice(train.shape[0], k, replace=False)], dtype=np.float32)
+
+    for _ in range(iters):
+        assign = _assign(train, centroids, batch)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # re-seed empty cells from random training points
+        if empty.any():
+            sums[empty] = train[rng.choice(train.shape[0], int(empty.sum()))]
+            norms[empty] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids, _assign(x, centroids, batch)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, batch: int) -> np.ndarray:
+    out = np.empty(x.shape[0], dtype=np.int32)
+    for start in range(0, x.shape[0], batch):
+        out[start:start + batch] = np.argmax(np.dot(x[start:start + batch], centroids.T), axis=1)
+    return out
+
+
+class IVFRetriever:
+    """Inverted-file ANN index. Recall is tuned with `nprobe` (cells scanned per query).
+
+    Filters are applied to the rows of the probed cells; if fewer than
+    `min_candidates` rows survive, more cells are probed until enough do (or
+    every cell has been scanned), so selective filters never starve results.
+    """
+
+    name = "ivf"
+
+    def __init__(self, vectors: np.ndarray, text_ids: np.ndarray, nlist: int = 0, nprobe: int = 8,
+                 min_candidates: int = 64, seed: int = 0):
+        self.vectors = vectors
+        self.text_ids = text_ids
+        if nlist <= 0:
+            nlist = int(np.clip(np.sqrt(vectors.shape[0]), 1, 4096))
+        self.centroids, text_cell = spherical_kmeans(as_float32(vectors), nlist, seed=seed)
+        self.nlist = self.centroids.shape[0]
+        self.nprobe = max(1, int(nprobe))
+        self.min_candidates = int(min_candidates)
+
+        # posting lists of dataset rows per cell, stored as one permutation + offsets
+        row_cell = text_cell[text_ids]
+        self._rows = np.argsort(row_cell, kind="stable").astype(np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(row_cell, minlength=self.nlist))])
+
+    def _cell_rows(self, cells: np.ndarray) -> np.ndarray:
+        if cells.size == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._rows[self._offsets[c]:self._offsets[c + 1]] for c in cells])
+
+    def candidates(self, q: np.ndarray, sel: Optional[Selection], k: int,
+                   nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(-np.dot(self.centroids, q))
+        probe = min(self.nlist, max(1, int(nprobe or self.nprobe)))
+        want = max(int(k), self.min_candidates)
+
+        rows = np.empty(0, dtype=np.int64)
+        done = 0
+        while True:
+            new_rows = self._cell_rows(order[done:probe])
+            if sel is not None:
+                new_rows = new_rows[sel.contains(new_rows)]
+            rows = np.concatenate([rows, new_rows])
+            done = probe
+            if rows.size >= want or done >= self.nlist:
+                break
+            probe = min(self.nlist, probe * 2)
+
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        return rows, _similarity(self.vectors, self.text_ids, rows, q)
+
+    def info(self) -> Dict[str, object]:
+        return {"mode": self.name, "nlist": self.nlist, "nprobe": self.nprobe}
+
+
+RETRIEVERS = {"exact": ExactRetriever, "ivf": IVFRetriever}
+
+
+def build_retriever(mode: str, vectors: np.ndarray, text_ids: np.ndarray, **kwargs):
+    mode = (mode or "exact").lower()
+    if mode not in RETRIEVERS:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {sorted(RETRIEVERS)}")
+    if mode == "exact":
+        return ExactRetriever(vectors, text_ids)
+    return RETRIEVERS[mode](vectors, text_ids, **kwargs)
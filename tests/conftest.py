@@ -0,0 +1,70 @@
+import zlib
+
+import numpy as np
+import pytest
+
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer: a normalized bag of per-word random vectors."""
+
+    dim = 32
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.calls += 1
+        self.texts += len(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i] += np.random.default_rng(zlib.crc32(word.encode())).standard_normal(self.dim)
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+
+CSV_HEADER = "person_name,email,followers,platform,category,country,hashtags\n"
+
+
+def write_catalog(path, rows: int = 60) -> str:
+    platforms = ["Instagram", "YouTube", "TikTok"]
+    categories = ["tech", "food", "travel", "fitness"]
+    countries = ["USA", "UK", "India", "Germany", "Brazil"]
+    tags = ["#gadgets #review", "#vegan #recipes", "#wanderlust", "#gym #health", "#tech"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(CSV_HEADER)
+        for i in range(rows):
+            f.write(f"Person {i},p{i}@example.com,{1000 * (i + 1)},{platforms[i % 3]},{categories[i % 4]},"
+                    f"{countries[i % 5]},{tags[i % 5]}\n")
+    return str(path)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """`main` with the fake encoder and no on-disk embedding cache."""
+    import main
+
+    model = FakeModel()
+    monkeypatch.setattr(main, "_get_model", lambda: model)
+    monkeypatch.setattr(main, "EMB_CACHE_DIR", "")
+    monkeypatch.setattr(main, "_emb_store", None)
+    return model
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch, fake_model):
+    """`main` serving a small synthetic catalog, with empty result caches and no LLM."""
+    import main
+
+    data = main._load_dataset(write_catalog(tmp_path / "catalog.csv"), None, {}, use_artifact=False)
+    monkeypatch.setattr(main, "_data", data)
+    monkeypatch.setattr(main, "_gemini_client", lambda: None)
+    for cache in (main._query_cache, main._rank_cache, main._outreach_cache):
+        cache.clear()
+    main._ready.set()
+    yield main
+    main._ready.clear()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionControl, Overloaded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _hold(ac: AdmissionControl, release: asyncio.Event, log=None, name=None):
+    async with ac.slot():
+        if log is not None:
+            log.append(name)
+        await release.wait()
+
+
+def test_sheds_when_queue_is_full():
+    async def scenario():
+        ac = AdmissionControl(limit=2, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        holders = [asyncio.ensure_future(_hold(ac, release)) for _ in range(3)]  # 2 active + 1 queued
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await ac.acquire()
+        stats = ac.stats()
+        release.set()
+        await asyncio.gather(*holders)
+        return stats, ac.stats()
+
+    during, after = run(scenario())
+    assert during["in_flight"] == 2 and during["waiting"] == 1 and during["shed"] == 1
+    assert after["in_flight"] == 0 and after["waiting"] == 0 and after["admitted"] == 3
+
+
+def test_queue_timeout_gives_up_without_leaking_a_slot():
+    async def scenario():
+        ac = AdmissionControl(limit=1, max_queue=4, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(ac, release))
+        await asyncio.sleep(0)
+        t0 = time.monotonic()
+        with pytest.raises(Overloaded):
+            await ac.acquire()
+        waited = time.monotonic() - t0
+        release.set()
+        await holder
+        await ac.acquire()  # the slot is free again
+        ac.release()
+        return waited, ac.stats()
+
+    waited, stats = run(scenario())
+    assert 0.04 <= waited < 1
+    assert stats["timed_out"] == 1 and stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def scenario():
+        ac = AdmissionControl(limit=1, max_queue=8, queue_timeout=5)
+        log, release = [], asyncio.Event()
+        first = asyncio.ensure_future(_hold(ac, release, log, "first"))
+        await asyncio.sleep(0)
+        waiters = []
+        for name in ("a", "b", "c"):
+            waiters.append(asyncio.ensure_future(_hold(ac, release, log, name)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *waiters)
+        return log
+
+    assert run(scenario()) == ["first", "a", "b", "c"]
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def scenario():
+        ac = AdmissionControl(limit=1, max_queue=4, queue_timeout=5)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(ac, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(ac.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await holder
+        return ac.stats()
+
+    stats = run(scenario())
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_timed_out_ranking_keeps_its_slot_until_the_thread_finishes(monkeypatch):
+    main = pytest.importorskip("main")
+    from fastapi import HTTPException
+
+    monkeypatch.setattr(main, "_match_admission", AdmissionControl(limit=1, max_queue=0))
+    monkeypatch.setattr(main, "RANK_TIMEOUT", 0.05)
+
+    async def scenario():
+        with pytest.raises(HTTPException) as slow:
+            await main._rank(time.sleep, 0.3)
+        # the 504 came back but the ranking thread is still busy: the slot is still taken
+        with pytest.raises(HTTPException) as shed:
+            await main._rank(time.sleep, 0)
+        busy = main._match_admission.stats()["in_flight"]
+        await asyncio.sleep(0.4)
+        return slow.value.status_code, shed.value.status_code, busy, main._match_admission.stats()
+
+    slow, shed, busy, after = run(scenario())
+    assert (slow, shed, busy) == (504, 503, 1)
+    assert after["in_flight"] == 0
+
+
+def test_timed_out_outreach_keeps_its_llm_slot_until_the_thread_finishes(monkeypatch):
+    main = pytest.importorskip("main")
+
+    class SlowClient:
+        class models:
+            @staticmethod
+            def generate_content(model, contents):
+                time.sleep(0.3)
+                return type("Resp", (), {"text": "late"})()
+
+    monkeypatch.setattr(main, "_gemini_client", lambda: SlowClient())
+    monkeypatch.setattr(main, "_llm_slots", AdmissionControl(limit=1, max_queue=0))
+    monkeypatch.setattr(main, "OUTREACH_TIMEOUT", 0.05)
+    row = {"person_name": "Ana", "email": "ana@example.com", "platform": "YouTube", "followers": 1000,
+           "country": "UK", "category": "tech", "hashtags": "#tech"}
+
+    async def scenario():
+        message = await main._outreach_async("brief", row, "Sam", "Acme")
+        # the fallback came back but the LLM thread is still busy: the slot is still taken
+        busy = main._llm_slots.stats()["in_flight"]
+        await asyncio.sleep(0.4)
+        return message, busy, main._llm_slots.stats()
+
+    message, busy, after = run(scenario())
+    assert message == main._fallback_outreach(row, "Sam", "Acme")
+    assert busy == 1 and after["in_flight"] == 0
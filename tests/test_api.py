@@ -0,0 +1,162 @@
+import asyncio
+import json
+import re
+import threading
+import time
+
+import pandas as pd
+
+
+def test_health_reads_frame_size_measured_at_load(served, monkeypatch):
+    expected = int(served._data.df.memory_usage(deep=True).sum())
+
+    def walk(*args, **kwargs):
+        raise AssertionError("/health walked the frame")
+
+    monkeypatch.setattr(pd.DataFrame, "memory_usage", walk)
+    body = served.health()
+    assert body["memory_bytes"]["frame"] == expected
+    assert body["rows"] == served._data.df.shape[0]
+
+
+def _briefs():
+    return ["tech gadget reviews", "vegan recipes for busy people", "budget travel", "home gym routines"]
+
+
+def test_batch_returns_the_same_matches_as_one_match_per_brief(served):
+    async def scenario():
+        batch = await served.match_batch(served.BatchMatchRequest(briefs=_briefs(), top_k=4, outreach=True))
+        single = [await served._match(served.MatchRequest(brief=b, top_k=4)) for b in _briefs()]
+        return batch, single
+
+    batch, single = asyncio.run(scenario())
+    assert [r["brief"] for r in batch["results"]] == _briefs()
+    for got, want in zip(batch["results"], single):
+        assert got["matches"] and got["matches"] == want["matches"]
+
+
+def test_batch_outreach_stays_within_one_budget(served, monkeypatch):
+    monkeypatch.setattr(served, "OUTREACH_WORKERS", 3)
+    monkeypatch.setattr(served, "OUTREACH_CONCURRENCY", 2)
+    in_flight, peak = [0], [0]
+
+    async def slow_outreach(brief, row, user_name=None, company_name=None):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        return f"{brief} -> {row['person_name']}"
+
+    monkeypatch.setattr(served, "_outreach_async", slow_outreach)
+    req = served.BatchMatchRequest(briefs=_briefs(), top_k=5, outreach=True)
+    body = asyncio.run(served.match_batch(req))
+
+    # min(OUTREACH_WORKERS, OUTREACH_CONCURRENCY * briefs) = min(3, 8)
+    assert peak[0] == 3
+    for result in body["results"]:
+        assert [m["outreach_message"] for m in result["matches"]] == \
+            [f"{result['brief']} -> {m['person_name']}" for m in result["matches"]]
+
+
+def _outreach_counts(main):
+    return {labels["result"]: value for _, labels, value in main._outreach_total.samples()}
+
+
+class FlakyClient:
+    """Blocking Gemini stand-in: every third call fails, every third times out, the rest succeed."""
+
+    def __init__(self, delay):
+        self.calls = 0
+        self.delay = delay
+        self.models = self
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        if self.calls % 3 == 1:
+            raise RuntimeError("quota")
+        if self.calls % 3 == 2:
+            time.sleep(self.delay)
+        return type("Resp", (), {"text": "Hi from the LLM"})()
+
+
+def test_outreach_counter_moves_once_per_message_in_match_and_stream(served, monkeypatch):
+    client = FlakyClient(delay=0.2)
+    monkeypatch.setattr(served, "_gemini_client", lambda: client)
+    monkeypatch.setattr(served, "OUTREACH_TIMEOUT", 0.05)
+
+    async def stream(req):
+        response = await served.match_stream(req)
+        return [json.loads(line) async for line in response.body_iterator]
+
+    async def scenario():
+        before = _outreach_counts(served)
+        body = await served._match(served.MatchRequest(brief="tech gadget reviews", top_k=6))
+        after_match = _outreach_counts(served)
+        events = await stream(served.MatchRequest(brief="budget travel", top_k=6))
+        after_stream = _outreach_counts(served)
+        await asyncio.sleep(0.3)  # let the timed-out calls return
+        return before, body, after_match, events, after_stream
+
+    before, body, after_match, events, after_stream = asyncio.run(scenario())
+
+    def delta(a, b):
+        return {k: b.get(k, 0) - a.get(k, 0) for k in ("generated", "fallback", "template")}
+
+    messages = [m["outreach_message"] for m in body["matches"]]
+    assert delta(before, after_match) == {"generated": messages.count("Hi from the LLM"),
+                                          "fallback": 6 - messages.count("Hi from the LLM"), "template": 0}
+    streamed = [e["outreach_message"] for e in events if e["event"] == "outreach"]
+    assert len(streamed) == 6
+    assert delta(after_match, after_stream) == {"generated": streamed.count("Hi from the LLM"),
+                                                "fallback": 6 - streamed.count("Hi from the LLM"), "template": 0}
+    assert client.calls == 12
+
+
+class SlowClient:
+    """Blocking Gemini stand-in that answers with the influencer's email after a per-influencer delay."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.models = self
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents):
+        email = re.search(r"^Email: (.+)$", contents, re.M).group(1)
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delays.get(email, 0.0))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return type("Resp", (), {"text": f"Hello {email}"})()
+
+
+def test_outreach_runs_concurrently_in_rank_order_with_fallback_on_timeout(served, monkeypatch):
+    monkeypatch.setattr(served, "OUTREACH_CONCURRENCY", 2)
+    monkeypatch.setattr(served, "OUTREACH_TIMEOUT", 0.15)
+    top = asyncio.run(served._match(served.MatchRequest(brief="tech gadget reviews", top_k=6, outreach=False)))
+    emails = [m["email"] for m in top["matches"]]
+    # later rows finish first; the last never makes the timeout
+    delays = {e: 0.01 * (len(emails) - i) for i, e in enumerate(emails)}
+    delays[emails[-1]] = 0.5
+    client = SlowClient(delays)
+    monkeypatch.setattr(served, "_gemini_client", lambda: client)
+
+    async def scenario():
+        body = await served._match(served.MatchRequest(brief="tech gadget reviews", top_k=6,
+                                                       user_name="Sam", company_name="Acme"))
+        await asyncio.sleep(0.5)  # let the timed-out call return
+        return body
+
+    body = asyncio.run(scenario())
+    assert [m["email"] for m in body["matches"]] == emails
+    for i, m in enumerate(body["matches"]):
+        if i == len(emails) - 1:
+            assert m["outreach_message"] == served._fallback_outreach(m, "Sam", "Acme")
+        else:
+            assert m["outreach_message"] == f"Hello {m['email']}"
+    assert client.peak == 2
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import artifact  # noqa: E402
+from retrieval import FilterIndex  # noqa: E402
+
+
+@pytest.fixture
+def dataset():
+    df = pd.DataFrame({
+        "person_name": ["Ana", "Ben", "", "Dee", "Eve"],
+        "email": ["ana@example.com", "", "cy@example.com", "dee@example.com", "eve@example.com"],
+        "followers": np.array([1000, 0, 25, 500_000, 2000], dtype=np.int64),
+        "platform": pd.Categorical(["Instagram", "YouTube", "", "TikTok", "TikTok"]),
+        "category": pd.Categorical(["tech", "tech", "", "food", "food"]),
+        "country": pd.Categorical(["USA", "UK", "", "India", "Mars"]),
+        "hashtags": pd.Categorical(["#gadgets", "#tech", "", "#vegan", "#vegan"]),
+        "continent": pd.Categorical(["North America", "Europe", "Other", "Asia", "Other"]),
+    })
+    texts = pd.Index(["tech #gadgets Instagram", "tech #tech YouTube", "  ", "food #vegan TikTok"], dtype=object)
+    emb = np.random.default_rng(0).standard_normal((4, 8)).astype(np.float32)
+    return df, texts, emb, np.array([0, 1, 2, 3, 3], dtype=np.int32), np.arange(5, dtype=np.uint64) * 7919
+
+
+def _as_strings(df):
+    return {col: [str(v) for v in df[col]] for col in df.columns}
+
+
+def test_write_then_read_round_trips(tmp_path, dataset):
+    df, texts, emb, emb_index, hashes = dataset
+    filters = FilterIndex(df).to_arrays()
+    path = str(tmp_path / "data.artifact")
+    artifact.write(path, df, texts, emb, emb_index, hashes, "model-a", {"path": "x.csv", "mtime": 1.0, "size": 2},
+                   filters=filters)
+
+    a = artifact.read(path)
+    assert list(a["df"].columns) == list(df.columns)
+    assert _as_strings(a["df"]) == _as_strings(df)
+    assert a["df"]["followers"].dtype == np.int64
+    assert list(a["texts"]) == list(texts)
+    np.testing.assert_array_equal(a["embeddings"], emb)
+    np.testing.assert_array_equal(a["emb_index"], emb_index)
+    np.testing.assert_array_equal(a["row_hashes"], hashes)
+    assert a["manifest"]["model"] == "model-a" and a["manifest"]["rows"] == 5
+    for col, arrays in filters.items():
+        assert a["filters"][col]["values"] == arrays["values"]
+        np.testing.assert_array_equal(a["filters"][col]["codes"], arrays["codes"])
+
+
+def test_writing_in_chunks_equals_writing_at_once(tmp_path, dataset):
+    df, texts, emb, emb_index, hashes = dataset
+    artifact.write(str(tmp_path / "whole.artifact"), df, texts, emb, emb_index, hashes, "m", {})
+
+    w = artifact.Writer(str(tmp_path / "chunked.artifact"))
+    for start in range(0, len(df), 2):
+        # each chunk brings its own categories; the artifact's dictionaries grow across batches
+        chunk = df.iloc[start:start + 2].copy()
+        for col in artifact.CATEGORICAL_COLUMNS:
+            chunk[col] = chunk[col].cat.remove_unused_categories()
+        w.append_rows(chunk, emb_index[start:start + 2])
+        w.append_array("row_hashes", hashes[start:start + 2])
+    w.array("embeddings", emb.shape)[:] = emb
+    w.close(texts, "m", {})
+
+    whole, chunked = artifact.read(str(tmp_path / "whole.artifact")), artifact.read(str(tmp_path / "chunked.artifact"))
+    assert _as_strings(chunked["df"]) == _as_strings(whole["df"])
+    np.testing.assert_array_equal(chunked["emb_index"], whole["emb_index"])
+    np.testing.assert_array_equal(chunked["row_hashes"], whole["row_hashes"])
+
+
+def test_failed_write_leaves_the_previous_artifact(tmp_path, dataset):
+    df, texts, emb, emb_index, hashes = dataset
+    path = str(tmp_path / "data.artifact")
+    artifact.write(path, df, texts, emb, emb_index, hashes, "old", {})
+    with pytest.raises(TypeError):
+        # fails at the very end, writing the manifest
+        artifact.write(path, df, texts, emb, emb_index, hashes, "new", {"mtime": object()})
+    assert artifact.read_manifest(path)["model"] == "old"
+    assert not [p for p in tmp_path.iterdir() if ".tmp-" in p.name]
+
+
+def test_publish_flips_current_and_prunes_old_generations(tmp_path, dataset):
+    df, texts, emb, emb_index, hashes = dataset
+    root = str(tmp_path / "shared")
+    for model in ("a", "b", "c"):
+        gen = artifact.publish(root, lambda p: artifact.write(p, df, texts, emb, emb_index, hashes, model, {}), keep=2)
+    assert artifact.current_generation(root) == gen and artifact.generation_number(gen) == 3
+    assert sorted(p.name for p in (tmp_path / "shared").iterdir()) == ["CURRENT", "gen-000002", "gen-000003"]
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batcher import MicroBatcher
+
+
+def test_concurrent_calls_share_batches_and_keep_their_results():
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [x * 2 for x in items]
+
+    b = MicroBatcher(double, window=0.05, max_batch=64)
+    with ThreadPoolExecutor(16) as ex:
+        results = list(ex.map(b.submit, range(16)))
+
+    assert results == [x * 2 for x in range(16)]
+    assert sum(len(c) for c in calls) == 16
+    assert len(calls) < 16
+    assert b.stats()["items"] == 16 and b.stats()["batches"] == len(calls)
+
+
+def test_batches_never_exceed_max_batch():
+    gate = threading.Event()
+    sizes = []
+
+    def fn(items):
+        gate.wait(5)  # hold the first batch so the rest queue up behind it
+        sizes.append(len(items))
+        return items
+
+    b = MicroBatcher(fn, window=0.01, max_batch=4)
+    with ThreadPoolExecutor(13) as ex:
+        futs = [ex.submit(b.submit, i) for i in range(13)]
+        gate.set()
+        assert sorted(f.result() for f in futs) == list(range(13))
+    assert max(sizes) <= 4
+    assert b.stats()["largest_batch"] <= 4
+
+
+def test_failure_reaches_every_caller_in_the_batch_and_worker_survives():
+    fail = threading.Event()
+    fail.set()
+
+    def fn(items):
+        if fail.is_set():
+            raise ValueError("encoder down")
+        return items
+
+    b = MicroBatcher(fn, window=0.05, max_batch=8)
+    with ThreadPoolExecutor(4) as ex:
+        futs = [ex.submit(b.submit, i) for i in range(4)]
+        for f in futs:
+            with pytest.raises(ValueError, match="encoder down"):
+                f.result()
+
+    fail.clear()
+    assert b.submit("ok") == "ok"
+
+
+def test_lone_call_runs_as_a_batch_of_one():
+    b = MicroBatcher(lambda items: items, window=0.0, max_batch=8)
+    assert b.submit(1) == 1
+    stats = b.stats()
+    assert stats["batches"] == 1 and stats["mean_batch"] == 1
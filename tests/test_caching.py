@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from caching import SingleFlight, TTLCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_callers_share_one_computation():
+    async def scenario():
+        sf, calls, stored = SingleFlight(), [], []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"rows": [1, 2, 3]}
+
+        results = await asyncio.gather(*(sf.do("k", compute, stored.append) for _ in range(5)))
+        return sf, calls, stored, results
+
+    sf, calls, stored, results = run(scenario())
+    assert len(calls) == 1 and len(stored) == 1
+    assert all(r is results[0] for r in results)
+    assert sf.stats() == {"in_flight": 0, "computed": 1, "shared": 4}
+
+
+def test_different_keys_compute_separately():
+    async def scenario():
+        sf = SingleFlight()
+
+        async def compute(v):
+            await asyncio.sleep(0.01)
+            return v
+
+        return await asyncio.gather(sf.do("a", lambda: compute("a")), sf.do("b", lambda: compute("b")))
+
+    assert run(scenario()) == ["a", "b"]
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        sf, stored = SingleFlight(), []
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(sf.do("k", compute, stored.append))
+        second = asyncio.ensure_future(sf.do("k", compute, stored.append))
+        await asyncio.sleep(0.01)
+        first.cancel()  # e.g. that client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, stored
+
+    result, stored = run(scenario())
+    assert result == "done"
+    assert stored == ["done"]  # the shared result is still delivered for caching
+
+
+def test_abandoned_computation_still_finishes_and_is_stored():
+    async def scenario():
+        sf, stored = SingleFlight(), []
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "late"
+
+        only = asyncio.ensure_future(sf.do("k", compute, stored.append))
+        await asyncio.sleep(0)
+        only.cancel()
+        await asyncio.sleep(0.05)
+        return stored, sf.stats()
+
+    stored, stats = run(scenario())
+    assert stored == ["late"] and stats["in_flight"] == 0
+
+
+def test_failure_reaches_all_callers_and_is_not_stored():
+    async def scenario():
+        sf, stored = SingleFlight(), []
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*(sf.do("k", compute, stored.append) for _ in range(3)),
+                                       return_exceptions=True)
+        return results, stored, sf.stats()
+
+    results, stored, stats = run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert stored == [] and stats["in_flight"] == 0
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    c = TTLCache(maxsize=2, ttl=0.05)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a is now most recently used
+    c.set("c", 3)
+    assert c.get("b") is None and c.get("a") == 1 and c.evictions == 1
+    time.sleep(0.06)
+    assert c.get("a") is None
+    assert TTLCache(maxsize=0).get("x", "miss") == "miss"
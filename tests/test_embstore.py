@@ -0,0 +1,53 @@
+import json
+import os
+
+import numpy as np
+
+from embstore import EmbeddingStore, encode_cached
+
+from conftest import FakeModel
+
+TEXTS = ["tech #gadgets Instagram", "food #vegan YouTube", "tech #gadgets Instagram", "travel #wanderlust TikTok"]
+
+
+def test_reopened_store_serves_every_vector_without_encoding(tmp_path):
+    first = FakeModel()
+    emb, encoded = encode_cached(first, TEXTS, EmbeddingStore(str(tmp_path), "model-a"), normalize_embeddings=True)
+    assert encoded == len(TEXTS)
+
+    again = FakeModel()
+    store = EmbeddingStore(str(tmp_path), "model-a")  # e.g. the next process start
+    cached, encoded = encode_cached(again, TEXTS, store, normalize_embeddings=True)
+
+    assert encoded == 0 and again.calls == 0
+    assert len(store) == 3 and store.hits == len(TEXTS)
+    np.testing.assert_array_equal(cached, emb)
+
+
+def test_new_texts_are_appended_as_a_segment(tmp_path):
+    encode_cached(FakeModel(), TEXTS[:2], EmbeddingStore(str(tmp_path), "model-a"))
+    model = FakeModel()
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    _, encoded = encode_cached(model, TEXTS, store)
+
+    assert encoded == 1 and model.texts == 1  # only the text not seen before
+    assert store.stats()["segments"] == 2 and len(EmbeddingStore(str(tmp_path), "model-a")) == 3
+
+
+def test_changing_the_model_invalidates_the_cache(tmp_path):
+    encode_cached(FakeModel(), TEXTS, EmbeddingStore(str(tmp_path), "model-a"))
+
+    other = EmbeddingStore(str(tmp_path), "model-b")
+    model = FakeModel()
+    _, encoded = encode_cached(model, TEXTS, other)
+    assert len(EmbeddingStore(str(tmp_path), "model-b")) == 3
+    assert encoded == len(TEXTS) and model.calls == 1
+
+    # a manifest written for another model is ignored even at the same path
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    with open(os.path.join(store.path, "manifest.json")) as f:
+        manifest = json.load(f)
+    manifest["model"] = "model-c"
+    with open(os.path.join(store.path, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    assert len(EmbeddingStore(str(tmp_path), "model-a")) == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import artifact  # noqa: E402
+import ingest  # noqa: E402
+import main  # noqa: E402
+from embstore import EmbeddingStore  # noqa: E402
+
+from conftest import FakeModel, write_catalog  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, fake_model):
+    s = EmbeddingStore(str(tmp_path / "cache"), main.EMB_MODEL)
+    monkeypatch.setattr(main, "EMB_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(main, "_emb_store", s)
+    return s
+
+
+def test_artifact_holds_exact_float32_whatever_the_serving_settings(tmp_path, monkeypatch, store):
+    # the server's .env may quantize and build IVF; ingest must do neither
+    monkeypatch.setattr(main, "EMB_QUANT", "int8")
+    monkeypatch.setattr(main, "RETRIEVAL_MODE", "ivf")
+
+    def no_index(*args, **kwargs):
+        raise AssertionError("ingest built a retrieval index")
+
+    monkeypatch.setattr(main, "build_retriever", no_index)
+    csv = write_catalog(tmp_path / "catalog.csv", rows=50)
+    ingest.encode_corpus(csv, chunk_rows=7)
+    ingest.compile_corpus(csv, str(tmp_path / "out.artifact"), chunk_rows=7)
+
+    a = artifact.read(str(tmp_path / "out.artifact"))
+    expected = FakeModel().encode(list(a["texts"]), normalize_embeddings=True)
+    assert a["embeddings"].dtype == np.float32
+    assert np.array_equal(np.asarray(a["embeddings"]), expected)
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from jobs import COMPLETED, EmailJobQueue
+
+
+class Outbox:
+    def __init__(self, fail=()):
+        self.sent = []
+        self.fail = set(fail)
+        self._lock = threading.Lock()
+
+    def __call__(self, email, name, subject, message):
+        if email in self.fail:
+            raise RuntimeError("mailbox full")
+        with self._lock:
+            self.sent.append(email)
+
+
+def _recipients(n):
+    return [{"email": f"r{i}@example.com", "name": f"R{i}", "message": "hi"} for i in range(n)]
+
+
+def _wait(q, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = q.status(job_id)
+        if status is not None and status["status"] == COMPLETED:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not complete: {q.status(job_id)}")
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(4) as ex:
+        yield ex
+
+
+def test_job_sends_everyone_and_folds_the_log_into_the_snapshot(tmp_path, pool):
+    out = Outbox()
+    q = EmailJobQueue(str(tmp_path), out, pool, backoff=0)
+    q.start()
+    job = q.submit(_recipients(10), "Hello")
+    status = _wait(q, job["job_id"])
+
+    assert status["success"] == 10 and status["failed"] == 0
+    assert sorted(out.sent) == sorted(r["email"] for r in _recipients(10))
+    assert os.listdir(tmp_path) == [job["job_id"] + ".json"]
+    with open(tmp_path / (job["job_id"] + ".json")) as f:
+        assert all(r["status"] == "sent" for r in json.load(f)["recipients"])
+
+
+def test_resume_skips_recipients_already_sent(tmp_path, pool):
+    # a job interrupted mid-run: snapshot says running, the log has the first three sends
+    # and a torn last line from the crash
+    job = {
+        "job_id": "interrupted", "status": "running", "subject": "Hello", "campaign_brief": None,
+        "created_at": time.time(), "started_at": time.time(), "finished_at": None,
+        "recipients": [dict(r, status="pending", attempts=0, error=None, sent_at=None) for r in _recipients(6)],
+    }
+    with open(tmp_path / "interrupted.json", "w") as f:
+        json.dump(job, f)
+    with open(tmp_path / "interrupted.log", "w") as f:
+        for i in range(3):
+            f.write(json.dumps({"i": i, "status": "sent", "attempts": 1, "error": None, "sent_at": 1.0}) + "\n")
+        f.write('{"i": 3, "stat')
+
+    out = Outbox()
+    q = EmailJobQueue(str(tmp_path), out, pool, backoff=0)
+    q.start()
+    status = _wait(q, "interrupted")
+
+    assert sorted(out.sent) == [f"r{i}@example.com" for i in (3, 4, 5)]
+    assert status["success"] == 6 and status["resumed"] == 1
+    assert not (tmp_path / "interrupted.log").exists()
+
+
+def test_failed_recipients_are_retried_then_marked_failed(tmp_path, pool):
+    out = Outbox(fail={"r1@example.com"})
+    q = EmailJobQueue(str(tmp_path), out, pool, max_attempts=3, backoff=0)
+    q.start()
+    status = _wait(q, q.submit(_recipients(3), "Hello")["job_id"])
+
+    failed = [r for r in status["results"] if r["status"] == "failed"]
+    assert status["success"] == 2 and [r["email"] for r in failed] == ["r1@example.com"]
+    assert failed[0]["attempts"] == 3 and failed[0]["error"] == "mailbox full"
+
+
+def test_completed_jobs_are_pruned_after_retention(tmp_path, pool):
+    q = EmailJobQueue(str(tmp_path), Outbox(), pool, retention=0.05)
+    q.start()
+    first = q.submit(_recipients(2), "Hello")["job_id"]
+    _wait(q, first)
+    time.sleep(0.1)
+    second = q.submit(_recipients(1), "Again")["job_id"]  # submitting sweeps expired jobs
+
+    assert q.status(first) is None
+    assert not (tmp_path / (first + ".json")).exists()
+    assert _wait(q, second)["success"] == 1
+
+
+def test_job_dir_is_created_by_the_first_job_not_the_queue(tmp_path, pool):
+    root = tmp_path / "jobs"
+    q = EmailJobQueue(str(root), Outbox(), pool, backoff=0)
+    q.start()
+    time.sleep(0.05)  # let the resume thread look for old jobs
+    assert not root.exists()
+
+    job = q.submit(_recipients(1), "Hello")
+    assert _wait(q, job["job_id"])["success"] == 1
+    assert (root / (job["job_id"] + ".json")).exists()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import artifact
+from conftest import CSV_HEADER, write_catalog
+
+# Rows 3-4 form a chunk with every categorical empty; followers come as floats, words
+# and blanks; countries with stray spaces and case; an unknown country; an extra column
+MESSY = [
+    "Ana,ana@example.com,1000,Instagram,tech,USA,#gadgets #review",
+    "Ben,,abc,YouTube,tech, uk ,#tech",
+    ",cy@example.com,,,,,",
+    "Dee,dee@example.com,5e5,,,,",
+    "Eve,eve@example.com,2000,TikTok,food,Mars,#vegan #recipes",
+    "Fay,fay@example.com,300,TikTok,food,india,#vegan #recipes",
+    "Gus,gus@example.com,12.0,123,travel,Brazil,#wanderlust",
+]
+
+
+@pytest.fixture
+def messy_csv(tmp_path):
+    path = tmp_path / "messy.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(CSV_HEADER.replace("\n", ",extra\n"))
+        f.writelines(f"{row},x\n" for row in MESSY)
+    return str(path)
+
+
+def _load(main, path, monkeypatch, chunk_rows):
+    monkeypatch.setattr(main, "CSV_CHUNK_ROWS", chunk_rows)
+    timings = {}
+    return main._load_dataset(path, None, timings, use_artifact=False), timings
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_chunked_load_equals_one_chunk_load(messy_csv, monkeypatch, fake_model, compact):
+    import main
+
+    monkeypatch.setattr(main, "COMPACT_MODE", compact)
+    chunked, chunked_timings = _load(main, messy_csv, monkeypatch, 2)
+    whole, whole_timings = _load(main, messy_csv, monkeypatch, 100_000)
+    assert (chunked_timings["csv_chunks"], whole_timings["csv_chunks"]) == (4, 1)
+
+    pd.testing.assert_frame_equal(chunked.df, whole.df)
+    assert list(chunked.df["followers"]) == [1000, 0, 0, 500_000, 2000, 300, 12]
+    assert list(chunked.df["continent"])[:3] == ["North America", "Europe", "Other"]
+    if compact:
+        for col in main._CATEGORICAL_COLUMNS:
+            assert isinstance(chunked.df[col].dtype, pd.CategoricalDtype)
+
+    # the same text for every row, whatever order the texts were first seen in
+    assert sorted(chunked.texts) == sorted(whole.texts)
+    assert list(chunked.texts[chunked.emb_index]) == list(whole.texts[whole.emb_index])
+    np.testing.assert_array_equal(chunked.embeddings[chunked.emb_index], whole.embeddings[whole.emb_index])
+    np.testing.assert_array_equal(chunked.row_hashes, whole.row_hashes)
+
+
+def test_worker_waits_for_a_newer_generation_after_rejecting_one(tmp_path, monkeypatch, fake_model):
+    pytest.importorskip("pyarrow")
+    import main
+
+    csv = write_catalog(tmp_path / "catalog.csv", rows=10)
+    whole, _ = _load(main, csv, monkeypatch, 100_000)
+    root = str(tmp_path / "shared")
+
+    def publish(model):
+        return artifact.publish(root, lambda p: artifact.write(
+            p, whole.df, whole.texts, np.asarray(whole.embeddings), whole.emb_index, whole.row_hashes, model, {}))
+
+    publish("some-other-model")
+    monkeypatch.setattr(main, "SHARED_DATA_DIR", root)
+    data = main._load_dataset(csv, None, {})
+
+    # served from the CSV; the rejected generation does not count as a change
+    assert "generation" not in data.source and data.source["rejected_generation"] == "gen-000001"
+    assert not main._source_changed(data)
+    publish(main.EMB_MODEL)
+    assert main._source_changed(data)
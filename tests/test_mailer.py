@@ -0,0 +1,118 @@
+import logging
+import smtplib
+import socket
+import threading
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from mailer import RateLimiter, SMTPPool
+
+aiosmtpd = pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _server(inbox: Inbox, port: int) -> Controller:
+    controller = Controller(inbox, hostname="127.0.0.1", port=port, auth_require_tls=False,
+                            authenticator=lambda *args: AuthResult(success=True))
+    controller.start()
+    return controller
+
+
+def _message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"], msg["To"], msg["Subject"] = "a@example.com", "b@example.com", f"hello {i}"
+    msg.set_content("hi")
+    return msg
+
+
+@pytest.fixture
+def smtp():
+    inbox, port = Inbox(), _free_port()
+    servers = [_server(inbox, port)]
+    yield inbox, port, servers
+    for s in servers:
+        s.stop()
+
+
+def test_session_is_reused(smtp):
+    inbox, port, _ = smtp
+    pool = SMTPPool("127.0.0.1", port, "user", "secret", size=1, starttls=False)
+    for i in range(3):
+        pool.send(_message(i))
+    assert len(inbox.messages) == 3
+    assert pool.stats()["connects"] == 1
+    pool.close()
+
+
+def test_reconnects_after_dropped_session(smtp):
+    inbox, port, servers = smtp
+    pool = SMTPPool("127.0.0.1", port, "user", "secret", size=1, starttls=False)
+    pool.send(_message(0))
+
+    # the server goes away with our session idle in the pool, then comes back
+    servers.pop().stop()
+    servers.append(_server(inbox, port))
+
+    pool.send(_message(1))
+    stats = pool.stats()
+    assert len(inbox.messages) == 2
+    assert stats["reconnects"] == 1 and stats["connects"] == 2
+    assert stats["sent"] == 2 and stats["failed"] == 0
+    pool.close()
+
+
+def test_gives_up_when_server_stays_down(smtp):
+    _, port, servers = smtp
+    pool = SMTPPool("127.0.0.1", port, size=1, starttls=False, timeout=2, retries=1)
+    pool.send(_message(0))
+    servers.pop().stop()
+    with pytest.raises((smtplib.SMTPServerDisconnected, ConnectionError)):
+        pool.send(_message(1))
+    assert pool.stats()["failed"] == 1
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(20)  # one call per 50 ms
+    stamps = []
+    lock = threading.Lock()
+
+    def call():
+        limiter.wait()
+        with lock:
+            stamps.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stamps.sort()
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert min(gaps) >= 0.045
+    assert stamps[-1] - stamps[0] >= 0.19
+
+
+def test_rate_limit_defaults_by_provider():
+    assert SMTPPool("smtp.gmail.com", 587).stats()["rate_limit"] == 2.0
+    assert SMTPPool("localhost", 25).stats()["rate_limit"] is None
+    assert SMTPPool("smtp.gmail.com", 587, rate_limit=0).stats()["rate_limit"] is None
@@ -0,0 +1,79 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from retrieval import ExactRetriever, FilterIndex, IVFRetriever, QuantizedMatrix, build_retriever
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 500
+    return pd.DataFrame({
+        "continent": rng.choice(["Asia", "Europe", "North America", "Other"], n),
+        "platform": rng.choice(["Instagram", "TikTok", "YouTube", ""], n),
+        "category": rng.choice(["food", "tech", "travel"], n),
+    })
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    text_ids = rng.integers(0, 200, 1_000).astype(np.int32)
+    return vectors, text_ids
+
+
+def test_select_matches_a_pandas_mask(frame):
+    index = FilterIndex(frame)
+    options = {col: [None, ""] + sorted(frame[col].unique()) + ["Atlantis"] for col in frame.columns}
+    for values in itertools.product(*options.values()):
+        filters = dict(zip(options, values))
+        sel = index.select(**filters)
+        mask = np.ones(len(frame), dtype=bool)
+        for col, value in filters.items():
+            if value:
+                mask &= (frame[col] == value).to_numpy()
+        if sel is None:
+            assert mask.all()
+            continue
+        np.testing.assert_array_equal(sel.rows(), np.nonzero(mask)[0])
+        np.testing.assert_array_equal(sel.contains(np.arange(len(frame))), mask)
+
+
+def test_filter_index_round_trips_through_arrays(frame):
+    index = FilterIndex(frame)
+    again = FilterIndex.from_arrays(len(frame), index.to_arrays())
+    for filters in ({"continent": "Asia"}, {"platform": "TikTok", "category": "tech"}):
+        np.testing.assert_array_equal(again.select(**filters).rows(), index.select(**filters).rows())
+
+
+@pytest.mark.parametrize("filtered", [False, True])
+def test_ivf_probing_every_cell_equals_exact(corpus, frame, filtered):
+    vectors, text_ids = corpus
+    sel = FilterIndex(frame.iloc[np.arange(1_000) % 500]).select(category="tech") if filtered else None
+    exact = ExactRetriever(vectors, text_ids)
+    ivf = IVFRetriever(vectors, text_ids, nlist=12, min_candidates=1)
+    q = vectors[7]
+
+    rows, sims = ivf.candidates(q, sel, k=10, nprobe=ivf.nlist)
+    want_rows, want_sims = exact.candidates(q, sel, k=10)
+    order = np.argsort(rows)
+    np.testing.assert_array_equal(rows[order], want_rows)
+    np.testing.assert_allclose(sims[order], want_sims, rtol=1e-6)
+
+
+def test_int8_vectors_rank_like_float32(corpus):
+    vectors, text_ids = corpus
+    q = vectors[3]
+    sims = QuantizedMatrix(vectors, "int8").dot(q)
+    assert np.argmax(sims) == 3
+    np.testing.assert_allclose(sims, vectors @ q, atol=0.02)
+
+
+def test_unknown_mode_is_rejected(corpus):
+    with pytest.raises(ValueError):
+        build_retriever("hnsw", *corpus)